@@ -0,0 +1,6 @@
+""" Entry point of `python -m src` """
+import sys
+
+from src.cli import main
+
+sys.exit(main())
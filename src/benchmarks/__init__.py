@@ -0,0 +1,13 @@
+""" package benchmarks
+
+    Benchmarks of the fetch, parse, insert and GUI stages, on synthetic countries
+    pages of configurable size. Run them with
+
+        python -m src.benchmarks                      # compare with the saved baseline
+        python -m src.benchmarks parse --sizes 250,10000,100000
+        python -m src.benchmarks --save               # store the results as the new baseline
+
+    The run fails (exit code 1) if a benchmark got slower than the baseline by more
+    than the [benchmarks] threshold. Baselines are machine specific, which is why
+    they are kept under data/ rather than in the repository.
+"""
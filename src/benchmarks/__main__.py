@@ -0,0 +1,6 @@
+""" Entry point of `python -m src.benchmarks` """
+import sys
+
+from src.benchmarks.suite import main
+
+sys.exit(main())
@@ -0,0 +1,116 @@
+""" module pages
+
+    Synthetic countries pages and a local HTTP server for the benchmarks.
+
+    The pages reproduce the markup of https://www.scrapethissite.com/pages/simple/
+    (rows of three 'div.country' blocks inside '#countries > div.container'), so that
+    COUNTRIES_PLAN, including its threshold selector, works on them unchanged.
+"""
+
+import random
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+COUNTRY_TEMPLATE = '''<div class="col-md-4 country">
+<h3 class="country-name"><i class="flag-icon flag-icon-x"></i>
+ Country {index} &amp; Co
+</h3>
+<div class="country-info">
+<strong>Capital:</strong> <span class="country-capital">Capital {index}</span><br>
+<strong>Population:</strong> <span class="country-population">{population}</span><br>
+<strong>Area (km<sup>2</sup>):</strong> <span class="country-area">{area:.1f}</span>
+</div>
+</div><!--.col-->'''
+
+# the country whose area is the threshold of COUNTRIES_PLAN (10th row, first column)
+THRESHOLD_INDEX = 27
+
+
+@lru_cache(maxsize=8)
+def country_page(rows: int, seed: int = 1) -> str:
+    """ Generates a countries page.
+
+        Args:
+            rows (int): Number of countries on the page.
+            seed (int): Seed of the random populations and areas.
+
+        Returns:
+            str: The HTML page. The threshold country has a tiny area,
+            so (almost) all countries pass the threshold filter.
+    """
+    rnd = random.Random(seed)
+    out = [
+        '<html><head><title>Countries of the World</title></head><body>'
+        '<section id="countries"><div class="container">',
+        f'<div class="row"><div class="col-md-12"><h1>Countries <small>{rows} items</small></h1></div></div>',
+    ]
+    for index in range(rows):
+        if index % 3 == 0:
+            out.append('<div class="row">')
+        area = 0.1 if index == THRESHOLD_INDEX else rnd.randint(1, 10 ** 6)
+        out.append(COUNTRY_TEMPLATE.format(index=index, population=rnd.randint(0, 10 ** 8), area=area))
+        if index % 3 == 2 or index == rows - 1:
+            out.append('</div>')
+    out.append('</div></section></body></html>')
+    return '\n'.join(out)
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Serves country_page(n) at /countries/<n>."""
+
+    protocol_version = 'HTTP/1.1'   # keep-alive, like a real web server
+
+    def do_GET(self):
+        try:
+            rows = int(self.path.rstrip('/').rsplit('/', 1)[-1])
+        except ValueError:
+            self.send_error(404)
+            return
+
+        body = country_page(rows).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalSite:
+    """A local stand-in for the crawled site, running on a background thread.
+
+        Example:
+            >>> with LocalSite() as site:
+            ...     html = Crawler(site.url(250)).get_html()
+    """
+
+    def __init__(self) -> None:
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def url(self, rows: int) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/countries/{rows}'
+
+    def __enter__(self) -> 'LocalSite':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,128 @@
+""" module runner
+
+    Timing, baseline storage and regression checks for the benchmark suite.
+"""
+
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, TypedDict
+
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('benchmarks', logging.INFO)
+
+
+class BenchmarkSkipped(Exception):
+    """Raised by a benchmark whose environment is not available, e.g. no MySQL server."""
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class BenchmarkResult(TypedDict):
+    """Timings of one benchmark, in seconds"""
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+
+
+def measure(func: Callable[[], object], rounds: int = 5, warmup: int = 1,
+            setup: Optional[Callable[[], object]] = None) -> BenchmarkResult:
+    """ Times func over several rounds.
+
+        Args:
+            func (callable): The code to time.
+            rounds (int): Number of timed calls.
+            warmup (int): Number of untimed calls before the first round.
+            setup (callable, optional): Called, untimed, before every call of func.
+
+        Returns:
+            BenchmarkResult: Statistics of the round times.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    times: List[float] = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return {
+        'rounds': rounds,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def save_baseline(path: str, results: Dict[str, BenchmarkResult]) -> None:
+    """Writes results as a JSON baseline, together with a description of the machine."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    baseline = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+        },
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, BenchmarkResult]:
+    """Reads the results of a JSON baseline, or returns {} if there is none yet."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)['results']
+    except FileNotFoundError:
+        return {}
+
+
+def compare(results: Dict[str, BenchmarkResult], baseline: Dict[str, BenchmarkResult],
+            threshold: float) -> List[str]:
+    """ Compares the medians of results with a baseline.
+
+        Args:
+            results (dict): The current results.
+            baseline (dict): The baseline results.
+            threshold (float): Allowed slowdown, e.g. 0.2 for 20%.
+
+        Returns:
+            List[str]: The names of the benchmarks which got slower than allowed.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['median'] / baseline[name]['median']
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def format_table(results: Dict[str, BenchmarkResult], baseline: Dict[str, BenchmarkResult]) -> str:
+    """Formats results as a table, with the change against the baseline."""
+    lines = [f"{'benchmark':<40} {'median':>11} {'min':>11} {'stdev':>10} {'vs baseline':>12}"]
+    for name, result in results.items():
+        change = ''
+        if name in baseline:
+            change = f"{(result['median'] / baseline[name]['median'] - 1) * 100:+.1f}%"
+        lines.append(
+            f"{name:<40} {result['median'] * 1000:>9.2f}ms {result['min'] * 1000:>9.2f}ms "
+            f"{result['stdev'] * 1000:>8.2f}ms {change:>12}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,233 @@
+""" module suite
+
+    The benchmarks of the crawl pipeline stages, and the command line entry point.
+
+    Groups:
+        fetch   Crawler.get_html() and CrawlEngine.fetch_all() against a local HTTP server
+        parse   Scraper.get_countries_data() on every installed parser backend, and StreamScraper
+        insert  DB.insert_countries_data() and the change detection read, on the
+                [benchmarks] db_section database (skipped if it is not reachable)
+        embedded  the same on the SQLite and DuckDB backends, in a temporary directory
+        gui     loading all rows into CountriesTableModel, on the offscreen Qt platform
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.benchmarks.pages import LocalSite, country_page
+from src.benchmarks.runner import (
+    BenchmarkResult, BenchmarkSkipped, compare, format_table, load_baseline, logger, measure, save_baseline
+)
+from src.utils.config_loader import load_config
+
+CONFIG_FILE = 'src/config.ini'
+
+# a benchmark group yields (name, result) pairs for a page size
+BenchmarkGroup = Callable[[int, int], Iterator[Tuple[str, BenchmarkResult]]]
+
+
+def _scraped_rows(rows: int):
+    from src.data_processing.scraper import Scraper
+    return Scraper(country_page(rows)).get_countries_data()
+
+
+def bench_fetch(rows: int, rounds: int) -> Iterator[Tuple[str, BenchmarkResult]]:
+    from src.data_processing.crawl_engine import CrawlEngine
+    from src.data_processing.crawler import Crawler
+
+    with LocalSite() as site:
+        url = site.url(rows)
+
+        crawler = Crawler(url)
+        yield f'fetch/{rows}', measure(crawler.get_html, rounds)
+
+        engine = CrawlEngine(max_workers=8, max_per_host=8)
+        try:
+            yield f'fetch_engine/16x{rows}', measure(lambda: engine.fetch_all([url] * 16), rounds)
+        finally:
+            engine.close()
+
+
+def bench_parse(rows: int, rounds: int) -> Iterator[Tuple[str, BenchmarkResult]]:
+    from src.data_processing.scraper import PARSER_BACKENDS, Scraper, ScraperError, get_parser_backend
+    from src.data_processing.stream_scraper import StreamScraper
+
+    html = country_page(rows)
+
+    for name in PARSER_BACKENDS:
+        try:
+            get_parser_backend(name)
+        except ScraperError:
+            logger.info('parse/%s skipped: not installed', name)
+            continue
+        yield f'parse_{name}/{rows}', measure(lambda: Scraper(html, backend=name).get_countries_data(), rounds)
+
+    yield f'parse_stream/{rows}', measure(lambda: StreamScraper(html).get_countries_data(), rounds)
+
+
+def bench_insert(rows: int, rounds: int) -> Iterator[Tuple[str, BenchmarkResult]]:
+    from src.db.change_detection import diff_countries
+    from src.db.db import DB
+
+    db_section = load_config(CONFIG_FILE, 'benchmarks').get('db_section', 'mysql_benchmark')
+    try:
+        db = DB(CONFIG_FILE, section=db_section)
+    except Exception as e:
+        raise BenchmarkSkipped(f'database [{db_section}] not available: {e}') from e
+
+    db.create_countries_table()
+    data = _scraped_rows(rows)
+
+    def clear():
+        db.delete_countries([country.name for country in data])
+
+    yield f'insert/{rows}', measure(lambda: db.insert_countries_data(data), rounds, setup=clear)
+    yield f'diff/{rows}', measure(lambda: diff_countries(db.get_fingerprints(), data), rounds)
+    clear()
+
+
+def bench_embedded(rows: int, rounds: int) -> Iterator[Tuple[str, BenchmarkResult]]:
+    from src.db.change_detection import diff_countries
+    from src.db.sqlite_storage import SQLiteStorage
+
+    data = _scraped_rows(rows)
+
+    def open_duckdb(path: str):
+        from src.db.duckdb_storage import DuckDBStorage
+        return DuckDBStorage(path)
+
+    backends = (('sqlite', SQLiteStorage, 'countries.sqlite3'), ('duckdb', open_duckdb, 'countries.duckdb'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, open_storage, file_name in backends:
+            try:
+                storage = open_storage(os.path.join(directory, file_name))
+            except ImportError:
+                logger.info('%s skipped: not installed', name)
+                continue
+
+            try:
+                storage.create_countries_table()
+
+                def clear():
+                    storage.delete_countries([country.name for country in data])
+
+                yield f'insert_{name}/{rows}', measure(lambda: storage.insert_countries_data(data), rounds, setup=clear)
+                yield f'diff_{name}/{rows}', measure(lambda: diff_countries(storage.get_fingerprints(), data), rounds)
+            finally:
+                storage.close()
+
+
+class _RowSource:
+    """Serves select_window() from memory, so the GUI benchmark measures the model only."""
+
+    def __init__(self, rows: List[tuple]) -> None:
+        self.rows = rows
+
+    def select_window(self, order_by='id', descending=False, filter_column=None, filter_text='',
+                      after=None, limit=500):
+        start = after[1] if after else 0   # rows are ordered by id, which is their position + 1
+        return self.rows[start:start + limit]
+
+
+def bench_gui(rows: int, rounds: int) -> Iterator[Tuple[str, BenchmarkResult]]:
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6 import QtCore as qtc
+    from PyQt6 import QtWidgets as qtw
+
+    from src.gui.table_model import CountriesTableModel
+
+    app = qtw.QApplication.instance() or qtw.QApplication(sys.argv[:1])
+    column_names = ['id', 'name', 'capital', 'population', 'area', 'fingerprint', 'created_at', 'updated_at']
+    source = _RowSource([
+        (index, *country, '', None, None) for index, country in enumerate(_scraped_rows(rows), 1)
+    ])
+    model = CountriesTableModel(source, column_names)
+
+    def load_all():
+        model.reload()
+        while not model.exhausted:
+            if model.canFetchMore():
+                model.fetchMore()
+            app.processEvents(qtc.QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        # the display strings of a screenful of rows
+        for row in range(min(model.rowCount(), 50)):
+            for column in range(model.columnCount()):
+                model.data(model.index(row, column))
+
+    yield f'gui_model/{rows}', measure(load_all, rounds)
+
+
+BENCHMARK_GROUPS: Dict[str, BenchmarkGroup] = {
+    'fetch': bench_fetch,
+    'parse': bench_parse,
+    'insert': bench_insert,
+    'embedded': bench_embedded,
+    'gui': bench_gui,
+}
+
+
+def run(groups: List[str], sizes: List[int], rounds: int) -> Dict[str, BenchmarkResult]:
+    """Runs the benchmark groups for every page size and returns the results by benchmark name."""
+    results: Dict[str, BenchmarkResult] = {}
+    for group in groups:
+        for rows in sizes:
+            try:
+                for name, result in BENCHMARK_GROUPS[group](rows, rounds):
+                    logger.info('%s: %.2f ms', name, result['median'] * 1000)
+                    results[name] = result
+            except BenchmarkSkipped as e:
+                logger.warning('%s skipped: %s', group, e)
+                break
+    return results
+
+
+def build_parser(config: dict) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.benchmarks', description='Crawler benchmarks')
+    # no choices=: argparse checks them against the empty default of nargs='*', see main()
+    parser.add_argument('groups', nargs='*', metavar='GROUP', default=[],
+                        help=f"benchmark groups to run: {', '.join(BENCHMARK_GROUPS)} (default: all)")
+    parser.add_argument('--sizes', default=config.get('sizes', '250,10000'),
+                        help='comma separated numbers of countries per page')
+    parser.add_argument('--rounds', type=int, default=int(config.get('rounds', 5)))
+    parser.add_argument('--baseline', default=config.get('baseline', 'data/benchmarks/baseline.json'),
+                        help='JSON baseline to compare with')
+    parser.add_argument('--threshold', type=float, default=float(config.get('threshold', 0.2)),
+                        help='allowed slowdown against the baseline, e.g. 0.2 for 20%%')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    config = load_config(CONFIG_FILE, 'benchmarks')
+    parser = build_parser(config)
+    args = parser.parse_args(argv)
+    unknown = [group for group in args.groups if group not in BENCHMARK_GROUPS]
+    if unknown:
+        parser.error(f"unknown benchmark groups: {', '.join(unknown)} (choose from {', '.join(BENCHMARK_GROUPS)})")
+
+    # keep the per-request log lines of the pipeline out of the measurements
+    for name in ('crawler', 'crawl_engine', 'db', 'sqlite_storage', 'duckdb_storage', 'scraper', 'table_model'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run(args.groups or list(BENCHMARK_GROUPS), sizes, args.rounds)
+
+    baseline = load_baseline(args.baseline)
+    print(format_table(results, baseline))
+
+    if args.save:
+        save_baseline(args.baseline, {**baseline, **results})
+        logger.info('Baseline saved to %s', args.baseline)
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        logger.error('Slower than the baseline by more than %.0f%%: %s',
+                     args.threshold * 100, ', '.join(regressions))
+        return 1
+    return 0
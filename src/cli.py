@@ -0,0 +1,204 @@
+""" module cli
+
+    Headless command line interface for the crawler, usable on servers without a display:
+
+        python -m src run       # crawl the target URL and store the countries
+        python -m src run --sources   # crawl all sources of the [source:<name>] sections
+        python -m src replay    # re-run parse and insert on the latest archived page
+        python -m src export    # write the countries table as CSV (or Parquet, duckdb backend)
+        python -m src stats     # print row count and last update time
+        python -m src history   # list the crawls which changed countries, or show the
+                                # countries as of a time (--as-of) or the changes between two (--diff)
+
+    PyQt6 is never imported, and the crawler/database modules (requests, bs4,
+    the driver of the storage backend) are only imported by the command which needs them,
+    so that `--help` returns immediately.
+"""
+
+import argparse
+import csv
+import logging
+import sys
+from typing import List, Optional
+
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('cli', logging.INFO)
+
+CONFIG_FILE = 'src/config.ini'
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """Runs the crawl pipeline once."""
+    from src.data_processing.data_processor import DataProcessor
+    from src.utils.config_loader import load_config
+
+    target_url = args.url or load_config(CONFIG_FILE, 'data_processing')['target_url']
+
+    def report(stage: str, count: int) -> None:
+        logger.info('stage %s: %s rows', stage, count)
+
+    processor = DataProcessor(target_url=target_url)
+    if args.sources is not None:
+        for source, stats in processor.run_sources(args.sources or None, progress_callback=report).items():
+            logger.info('%s: %s inserted, %s updated, %s unchanged',
+                        source, stats['inserted'], stats['updated'], stats['unchanged'])
+    else:
+        processor.run(progress_callback=report)
+    return 0
+
+
+def replay_command(args: argparse.Namespace) -> int:
+    """Runs the parse and insert stages on archived pages, without network access."""
+    import datetime
+
+    from src.data_processing.data_processor import DataProcessor
+    from src.data_processing.snapshot_store import SnapshotError, SnapshotStore
+    from src.utils.config_loader import load_config
+
+    target_url = args.url or load_config(CONFIG_FILE, 'data_processing')['target_url']
+
+    if args.list:
+        store = SnapshotStore.from_config(CONFIG_FILE, 'snapshots')
+        for snapshot in store.list(None if args.all else target_url) if store else []:
+            fetched_at = datetime.datetime.fromtimestamp(snapshot['fetched_at'])
+            print(f"{snapshot['id'][:12]}  {fetched_at:%Y-%m-%d %H:%M:%S}  "
+                  f"{snapshot['size']:>9}  {snapshot['url']}")
+        return 0
+
+    processor = DataProcessor(target_url=target_url)
+    store = processor.snapshot_store
+    try:
+        if args.all:
+            # parsed in parallel, stored oldest first
+            all_stats = processor.replay_all(store.list(target_url) if store else [])
+        else:
+            all_stats = [processor.replay(store.find(args.snapshot) if args.snapshot and store else None)]
+
+        for stats in all_stats:
+            logger.info('%s inserted, %s updated, %s unchanged',
+                        stats['inserted'], stats['updated'], stats['unchanged'])
+    except SnapshotError as e:
+        logger.error(e)
+        return 1
+    return 0
+
+
+def export_command(args: argparse.Namespace) -> int:
+    """Writes the countries table as CSV, streaming it from the database, or as Parquet."""
+    from src.db.storage import create_storage
+
+    db = create_storage(CONFIG_FILE, section='storage')
+
+    if args.format == 'parquet':
+        if not hasattr(db, 'export_parquet'):
+            logger.error('Parquet export needs the duckdb storage backend, see the [storage] section')
+            return 1
+        db.export_parquet(args.output)
+        return 0
+
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(db.get_column_names())
+        count = 0
+        for row in db.iter_rows():
+            writer.writerow(row)
+            count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    logger.info('Exported %s rows', count)
+    return 0
+
+
+def stats_command(args: argparse.Namespace) -> int:
+    """Prints a short summary of the stored data."""
+    from src.db.storage import create_storage
+
+    db = create_storage(CONFIG_FILE, section='storage')
+
+    last_updated = db.get_last_updated_date()
+    print(f'countries:    {db.count_countries()}')
+    print(f"last updated: {last_updated if last_updated is not None else 'never'}")
+    return 0
+
+
+def history_command(args: argparse.Namespace) -> int:
+    """Reads the countries_history table: change times, the countries as of a time, or a diff."""
+    import datetime
+
+    from src.db.storage import create_storage
+
+    try:
+        as_of = datetime.datetime.fromisoformat(args.as_of) if args.as_of else None
+        diff = [datetime.datetime.fromisoformat(value) for value in args.diff] if args.diff else None
+    except ValueError as e:
+        logger.error('Invalid time: %s', e)
+        return 1
+
+    db = create_storage(CONFIG_FILE, section='storage')
+
+    if as_of is not None:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(['name', 'capital', 'population', 'area'])
+        writer.writerows(db.select_as_of(as_of, args.source))
+    elif diff is not None:
+        changes = db.diff_between(diff[0], diff[1], args.source)
+        for country in changes['added']:
+            print(f'+ {country.name}')
+        for country in changes['changed']:
+            print(f'~ {country.name}')
+        for name in changes['removed']:
+            print(f'- {name}')
+        print(f"{len(changes['added'])} added, {len(changes['changed'])} changed, "
+              f"{len(changes['removed'])} removed, {changes['unchanged']} unchanged")
+    else:
+        for changed_at in db.get_change_times(args.source):
+            print(f'{changed_at:%Y-%m-%d %H:%M:%S.%f}')
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src', description='Countries crawler')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='crawl the target URL and store the countries')
+    run_parser.add_argument('--url', help='URL to crawl instead of [data_processing] target_url')
+    run_parser.add_argument('--sources', nargs='*', metavar='NAME',
+                            help='crawl the [source:NAME] sections instead (no names: all enabled sources)')
+    run_parser.set_defaults(handler=run_command)
+
+    replay_parser = subparsers.add_parser('replay', help='parse and store archived pages instead of crawling')
+    replay_parser.add_argument('--url', help='URL whose snapshots to replay instead of [data_processing] target_url')
+    replay_parser.add_argument('--snapshot', help='id (or id prefix) of the snapshot to replay (default: latest)')
+    replay_parser.add_argument('--all', action='store_true',
+                               help='replay all snapshots of the URL, oldest first (with --list: of all URLs)')
+    replay_parser.add_argument('--list', action='store_true', help='only list the snapshots')
+    replay_parser.set_defaults(handler=replay_command)
+
+    export_parser = subparsers.add_parser('export', help='export the countries table as CSV or Parquet')
+    export_parser.add_argument('-o', '--output',
+                               help='output file (default: stdout, for parquet: [storage] parquet_file)')
+    export_parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                               help='parquet needs the duckdb storage backend (default: csv)')
+    export_parser.set_defaults(handler=export_command)
+
+    stats_parser = subparsers.add_parser('stats', help='show row count and last update time')
+    stats_parser.set_defaults(handler=stats_command)
+
+    history_parser = subparsers.add_parser('history', help='list the changing crawls, or read past countries')
+    history_parser.add_argument('--source', default='default', help='source of the countries (default: default)')
+    history_group = history_parser.add_mutually_exclusive_group()
+    history_group.add_argument('--as-of', metavar='TIME', help='print the countries as of TIME, e.g. 2024-05-01T12:00')
+    history_group.add_argument('--diff', nargs=2, metavar=('START', 'END'),
+                               help='print the countries added, changed and removed between two times')
+    history_parser.set_defaults(handler=history_command)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
@@ -1,12 +1,23 @@
 """This module contains the Crawler class for retrieving HTML content from a URL."""
 
+import codecs
 import os
 import logging
+import time
+from typing import Iterator, List, Optional
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
 
+from src.data_processing.http_cache import HttpCache
+from src.data_processing.resilience import CircuitOpenError, FetchPolicy
+from src.utils.metrics import metrics
 from src.utils.setup_logging import setup_logger
 logger = setup_logger('crawler', logging.INFO)
 
+USER_AGENT = "A scrapper for learning"
+
 
 class CrawlerError(Exception):
     """Custom exception for errors related to Crawler."""
@@ -15,14 +26,38 @@ class CrawlerError(Exception):
         super().__init__(message)
 
 
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Creates a requests.Session with a keep-alive connection pool.
+
+        Args:
+            pool_size (int): Maximum number of connections kept open per host.
+
+        Returns:
+            requests.Session: A session which reuses TCP/TLS connections between requests.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+
 class Crawler:
     """A class for retrieving HTML content from a URL.
 
         This class provides methods for fetching HTML content from a given URL and saving it to a file.
     """
 
-    def __init__(self, url):
+    def __init__(self, url, session: Optional[requests.Session] = None, cache: Optional[HttpCache] = None,
+                 policy: Optional[FetchPolicy] = None):
         self.target_url = url
+        self.session = session if session is not None else create_session()
+        self.cache = cache
+        # timeouts, rate limit, retries and circuit breaker; share one policy between the crawlers of a run
+        self.policy = policy if policy is not None else FetchPolicy()
+        # True when the last get_html() call was answered from the cache
+        self.not_modified = False
 
     def save_to_file(self, html, filename="../data/content.html"):
         """Save the HTML content to a file, creating parent directories if needed."""
@@ -30,20 +65,211 @@ class Crawler:
         with open(filename, 'w', encoding="utf-8") as f:
             f.write(html)
 
-    def get_html(self):
-        """Retrieves the HTML content of a given URL, handling errors appropriately."""
-        # set user-agent
-        user_agent = "A scrapper for learning"
-        headers = {"User-Agent": user_agent}
+    @metrics.timed('fetch')
+    def get_html(self, url: Optional[str] = None):
+        """Retrieves the HTML content of a given URL, handling errors appropriately.
+
+            Args:
+                url (str, optional): The URL to fetch. Defaults to self.target_url.
+        """
+        url = url or self.target_url
+        self.not_modified = False
 
-        # perform GET request
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            logger.info('HTML served from cache!')
+            metrics.inc('fetch_cache_hits')
+            self.not_modified = True
+            return self.cache.read_body(url)
+
+        # perform (conditional) GET request, reusing the pooled connection of the session
         try:
-            response = requests.get(self.target_url, headers=headers, timeout=5)
+            response = self._get(url, HttpCache.conditional_headers(entry))
+
+            if response.status_code == 304 and entry:
+                logger.info('HTML not modified!')
+                metrics.inc('fetch_not_modified')
+                self.cache.refresh(url)
+                self.not_modified = True
+                return self.cache.read_body(url)
+
             response.raise_for_status()  # Raise an exception for non-200 status codes
-            logger.debug('Response: %s', response.text)
             response.encoding = "utf-8"
+            if logger.isEnabledFor(logging.DEBUG):
+                # only decode and format the (large) body when it is actually logged
+                logger.debug('Response: %.500s', response.text)
             logger.info('HTML retrieved!')
+            metrics.inc('bytes_downloaded', len(response.content))
+
+            if self.cache:
+                self.cache.store(
+                    url,
+                    response.text,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                )
             return response.text
         except requests.exceptions.RequestException as e:
-            logger.error("Failed to retrieve HTML from %s: %s", self.target_url, e)
+            logger.error("Failed to retrieve HTML from %s: %s", url, e)
             raise  # re-raise the exception to be handled by the caller
+
+    def stream_html(self, url: Optional[str] = None, chunk_size: int = 65536) -> Iterator[str]:
+        """Like get_html(), but hands out the body in chunks while it is downloaded.
+
+            The request is sent, and self.not_modified set, before this method returns;
+            the body is read as the returned iterator is consumed. A page served from
+            the cache is yielded as a single chunk. A downloaded page is only kept in
+            memory, to be stored in the cache at the end, if there is a cache.
+
+            Args:
+                url (str, optional): The URL to fetch. Defaults to self.target_url.
+                chunk_size (int, optional): Bytes read from the connection at a time.
+
+            Returns:
+                Iterator[str]: The decoded chunks of the body.
+        """
+        url = url or self.target_url
+        self.not_modified = False
+
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            logger.info('HTML served from cache!')
+            metrics.inc('fetch_cache_hits')
+            self.not_modified = True
+            return iter([self.cache.read_body(url)])
+
+        start = time.perf_counter()
+        try:
+            response = self._get(url, HttpCache.conditional_headers(entry), stream=True)
+
+            if response.status_code == 304 and entry:
+                response.close()
+                logger.info('HTML not modified!')
+                metrics.inc('fetch_not_modified')
+                self.cache.refresh(url)
+                self.not_modified = True
+                return iter([self.cache.read_body(url)])
+
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error("Failed to retrieve HTML from %s: %s", url, e)
+            raise
+
+        return self._iter_body(url, response, chunk_size, start)
+
+    def _iter_body(self, url: str, response: requests.Response, chunk_size: int,
+                   start: float) -> Iterator[str]:
+        """Yields the body of a streamed response as UTF-8 decoded chunks, then caches it."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        parts: Optional[List[str]] = [] if self.cache else None
+        size = 0
+
+        try:
+            for data in response.iter_content(chunk_size=chunk_size):
+                size += len(data)
+                text = decoder.decode(data)
+                if text:
+                    if parts is not None:
+                        parts.append(text)
+                    yield text
+            text = decoder.decode(b'', final=True)
+            if text:
+                if parts is not None:
+                    parts.append(text)
+                yield text
+        except requests.exceptions.RequestException as e:
+            logger.error("Failed to retrieve HTML from %s: %s", url, e)
+            raise
+        finally:
+            response.close()
+
+        metrics.observe('fetch', time.perf_counter() - start)
+        metrics.inc('bytes_downloaded', size)
+        logger.info('HTML retrieved!')
+
+        if self.cache and parts is not None:
+            self.cache.store(
+                url,
+                ''.join(parts),
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
+
+    def _get(self, url: str, headers: dict, stream: bool = False) -> requests.Response:
+        """ Sends a GET request under the fetch policy.
+
+            The request waits for the rate limit of its host. Connection errors, timeouts,
+            429 and 5xx responses are retried after a jittered exponential backoff, or
+            after the Retry-After delay sent by the server; a 429 also holds back the
+            other requests to the host. Failures count towards the circuit breaker of
+            the host, which rejects requests while it is open. Other request errors are
+            not retried, but count as failures as well.
+
+            Args:
+                url (str): The URL to fetch.
+                headers (dict): Extra request headers, e.g. the conditional ones of the cache.
+                stream (bool, optional): Return as soon as the headers arrived, see stream_html().
+
+            Returns:
+                requests.Response: The response of the last attempt, which may be an error status.
+
+            Raises:
+                requests.exceptions.RequestException: If the last attempt failed to connect or
+                timed out, if the request failed otherwise (e.g. too many redirects), or
+                CircuitOpenError if the circuit of the host is open.
+        """
+        policy = self.policy
+        host = urlsplit(url).netloc
+
+        attempt = 0
+        while True:
+            try:
+                trial = policy.circuit_breaker.before_request(host)
+            except CircuitOpenError:
+                metrics.inc('fetch_circuit_open')
+                raise
+
+            try:
+                waited = policy.rate_limiter.acquire(host)
+                if waited:
+                    metrics.observe('rate_limit_wait', waited)
+
+                try:
+                    response = self.session.get(url, headers=headers, timeout=policy.timeout, stream=stream)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    policy.circuit_breaker.record_failure(host)
+                    if attempt >= policy.retry.max_retries:
+                        raise
+                    reason = str(e)
+                    delay = policy.retry.delay(attempt)
+                except requests.exceptions.RequestException:
+                    # not worth retrying, but a failed trial request has to re-open the circuit
+                    policy.circuit_breaker.record_failure(host)
+                    raise
+                else:
+                    if response.status_code not in policy.retry.RETRY_STATUSES:
+                        policy.circuit_breaker.record_success(host)
+                        return response
+
+                    reason = f'HTTP {response.status_code}'
+                    delay = policy.retry.delay(
+                        attempt, policy.retry.parse_retry_after(response.headers.get('Retry-After'))
+                    )
+                    if response.status_code == 429:
+                        # the host is up but throttling us: hold back all its requests instead of counting a failure
+                        policy.rate_limiter.pause(host, delay)
+                    else:
+                        policy.circuit_breaker.record_failure(host)
+                    if attempt >= policy.retry.max_retries:
+                        return response
+                    response.close()
+            finally:
+                if trial:
+                    # a no-op once the outcome was recorded; otherwise (429, unexpected error)
+                    # another trial may follow, instead of the circuit staying open for good
+                    policy.circuit_breaker.release_trial(host)
+
+            attempt += 1
+            metrics.inc('fetch_retries')
+            logger.warning('Retry %s/%s of %s in %.2fs: %s', attempt, policy.retry.max_retries, url, delay, reason)
+            time.sleep(delay)
@@ -4,7 +4,7 @@
 
     It includes functionality to scrape data from the target URL using a Crawler,
     extract relevant information using a Scraper,
-    and insert the data into a database using a DB instance.
+    and insert the data into the storage backend selected in the [storage] config section.
 
     Classes:
         DataProcessor: A class for processing data from a target URL.
@@ -16,19 +16,51 @@
         To use the DataProcessor class:
         >>> processor = DataProcessor(target_url='https://example.com')
         >>> processor.run()
+
+        With pipeline = streaming in the [data_processing] config section, run() fetches,
+        parses and stores the page concurrently, see StreamPipeline.
+
+        Every crawled page is archived in the SnapshotStore, and
+        >>> processor.replay()
+        runs the parse and insert stages again on the latest archived page, offline.
 """
 
 import logging
-from typing import List
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
 
+from src.data_processing.crawl_engine import CrawlEngine
 from src.data_processing.crawler import Crawler
+from src.data_processing.http_cache import HttpCache
+from src.data_processing.parallel_parser import ParallelParser
+from src.data_processing.resilience import FetchPolicy
 from src.data_processing.scraper import Scraper, ScraperError
-from src.db.db import DB
-from src.shared_types import CountryData
+from src.data_processing.snapshot_store import SnapshotError, SnapshotStore
+from src.data_processing.source_scheduler import SourceScheduler
+from src.data_processing.sources import load_sources
+from src.data_processing.stream_pipeline import StreamPipeline
+from src.data_processing.stream_scraper import StreamScraper
+from src.db.change_detection import diff_countries, fingerprint
+from src.db.storage import create_storage
+from src.shared_types import DEFAULT_SOURCE, CountryData, SnapshotInfo, UpsertStats
+from src.utils.config_loader import load_config
+from src.utils.metrics import metrics
 from src.utils.setup_logging import setup_logger
 
 # Set up logger
-logger = setup_logger('data_processor', logging.DEBUG)
+logger = setup_logger('data_processor', logging.INFO)
+
+# called with the name of a pipeline stage ('fetch', 'parse', 'insert') and its row count
+ProgressCallback = Callable[[str, int], None]
+
+
+class CrawlCancelled(Exception):
+    """Raised when a running pipeline is cancelled through its cancel_event."""
+
+    def __init__(self, message: str = 'Crawl cancelled') -> None:
+        super().__init__(message)
 
 
 class DataProcessor:
@@ -39,42 +71,531 @@ class DataProcessor:
                 target_url (str): The URL from which to scrape data.
         """
         self.target_url = target_url
-        self.db = DB(config_file='src/config.ini', section='mysql')
+        self.db = create_storage('src/config.ini', section='storage')
+        self.db.create_countries_table()
+        self.db.migrate_countries_table()
+        self.http_cache = HttpCache.from_config('src/config.ini', section='http_cache')
+        self.snapshot_store = SnapshotStore.from_config('src/config.ini', section='snapshots')
+        self.fetch_policy = FetchPolicy.from_config('src/config.ini', section='crawler')
 
-    def scrape_data(self) -> List[CountryData]:
-        """ Scrape data from the target URL and extract relevant information.
+        data_processing_config = load_config('src/config.ini', 'data_processing')
+        self.scraper_engine = data_processing_config.get('scraper_engine', 'tree')
+        self.parser_backend = data_processing_config.get('parser_backend', 'auto')
+        # 'staged' or 'streaming', see run()
+        self.pipeline = data_processing_config.get('pipeline', 'staged')
+        self.stream_pipeline = StreamPipeline.from_config('src/config.ini', section='data_processing')
+
+        crawler_config = load_config('src/config.ini', 'crawler')
+        # pages of at least this many characters are parsed by several processes, 0 = never
+        self.large_page_size = int(crawler_config.get('large_page_size', 2000000))
+        # shared by all large pages and replays of a run; its workers start on first use
+        # and are stopped by the end of run(), replay(), replay_all() and scrape_urls()
+        self.parallel_parser = ParallelParser.from_config('src/config.ini')
 
-            List[Dict[str, Union[str, float]]]: A list of dictionaries containing the scraped data.
+        self.metrics_config = load_config('src/config.ini', 'metrics')
+
+    def create_scraper(self, html: str):
+        """ Create the scraper selected by the 'scraper_engine' and 'parser_backend' config keys.
+
+            Parameters:
+                html (str): The HTML content to scrape.
+
+            Returns:
+                Scraper | StreamScraper: A scraper exposing get_countries_data().
         """
-        crawler = Crawler(self.target_url)
+        if self.scraper_engine == 'stream':
+            return StreamScraper(html)
+        return Scraper(html, backend=self.parser_backend)
 
-        html = crawler.get_html()
+    def parse(self, html: str, source: str = '') -> List[CountryData]:
+        """ Extract the countries data from a page.
+
+            Pages of at least large_page_size characters ([crawler] config section) are
+            split across several processes, see parse_large().
 
-        scraper = Scraper(html)
+            Parameters:
+                html (str): The HTML content to scrape.
+                source (str, optional): Where the page came from, for the log messages.
+
+            Returns:
+                List[CountryData]: The scraped data, empty if the page could not be scraped.
+        """
         try:
-            countries_data = scraper.get_countries_data()
+            with metrics.timer('parse'):
+                if self.large_page_size and len(html) >= self.large_page_size:
+                    countries_data = self.parse_large(html)
+                else:
+                    countries_data = self.create_scraper(html).get_countries_data()
         except ScraperError as e:
-            logger.error('Error scraping data: %s', e)
+            logger.error('Error scraping data from %s: %s', source or 'page', e)
+            return []
+
+        metrics.inc('rows_scraped', len(countries_data))
+        return countries_data
+
+    def parse_large(self, html: str) -> List[CountryData]:
+        """ Extract the countries data from a large page on several processes, see ParallelParser.parse_large().
+
+            On a single CPU the page is parsed in this process, as the worker would only add overhead.
+
+            Raises:
+                ScraperError: If the page cannot be scraped.
+        """
+        if self.parallel_parser.workers < 2:
+            return self.create_scraper(html).get_countries_data()
+        logger.info('Parsing a page of %s characters on %s processes', len(html), self.parallel_parser.workers)
+        return self.parallel_parser.parse_large(html)
+
+    def save_snapshot(self, url: str, html: str) -> None:
+        """Archive a crawled page in the snapshot store, if enabled. Failures are only logged."""
+        if self.snapshot_store is None:
+            return
+        try:
+            self.snapshot_store.save(url, html)
+        except OSError as e:
+            logger.error('Failed to save snapshot of %s: %s', url, e)
+
+    def forget_page(self, url: str) -> None:
+        """ Drops the cached copy of a page which was fetched but not stored (parse failure,
+            no rows or cancellation), so that the next crawl does not skip it as not modified.
+        """
+        if self.http_cache:
+            self.http_cache.invalidate(url)
+
+    def _archived(self, url: str, chunks: Iterable[str]) -> Iterator[str]:
+        """Passes the chunks of a page through and archives the page after the last one."""
+        if self.snapshot_store is None:
+            yield from chunks
+            return
+
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        self.save_snapshot(url, ''.join(parts))
 
-        logger.debug(countries_data[:10])
+    @staticmethod
+    def _report(progress_callback: Optional[ProgressCallback], stage: str, count: int,
+                cancel_event: Optional[threading.Event]) -> None:
+        """Reports the progress of a stage and stops the pipeline if it was cancelled."""
+        if progress_callback:
+            progress_callback(stage, count)
+        if cancel_event is not None and cancel_event.is_set():
+            raise CrawlCancelled()
+
+    def scrape_data(self, progress_callback: Optional[ProgressCallback] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Optional[List[CountryData]]:
+        """ Scrape data from the target URL and extract relevant information.
+
+            Parameters:
+                progress_callback (callable, optional): Called with (stage, count) after each stage.
+                cancel_event (threading.Event, optional): When set, the pipeline stops with CrawlCancelled.
+
+            List[Dict[str, Union[str, float]]]: A list of dictionaries containing the scraped data,
+            or None if the page has not changed since the last crawl.
+        """
+        crawler = Crawler(self.target_url, cache=self.http_cache, policy=self.fetch_policy)
+
+        self._report(progress_callback, 'fetch', 0, cancel_event)
+        html = crawler.get_html()
+        if crawler.not_modified:
+            logger.info('%s not modified since the last crawl', self.target_url)
+            return None
+        try:
+            self.save_snapshot(self.target_url, html)
+            self._report(progress_callback, 'parse', 0, cancel_event)
+
+            countries_data = self.parse(html, self.target_url)
+        except BaseException:
+            self.forget_page(self.target_url)
+            raise
+        if not countries_data:
+            # a broken page, or a parse failure: its rows are not stored, so do not cache it
+            self.forget_page(self.target_url)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('First countries: %s', countries_data[:10])
         logger.info('Fetched %s countries data', len(countries_data))
 
         return countries_data
 
-    def insert_data(self, data: List[CountryData]) -> None:
-        """ Insert the provided data into the database.
+    def scrape_urls(self, urls: List[str]) -> List[CountryData]:
+        """ Fetch several pages concurrently and extract the countries data of each.
+
+            Parameters:
+                urls (list): The URLs of the pages to scrape, e.g. paginated listings.
+
+            A page which cannot be fetched, even after the retries of the fetch policy,
+            is logged and skipped.
+
+            Returns:
+                List[CountryData]: The scraped data of all fetched pages, in the order of urls.
+        """
+        crawler_config = load_config('src/config.ini', 'crawler')
+        engine = CrawlEngine(
+            max_workers=int(crawler_config.get('max_workers', 8)),
+            max_per_host=int(crawler_config.get('max_per_host', 4)),
+            policy=self.fetch_policy,
+        )
+        countries_data: List[CountryData] = []
+
+        try:
+            for url, html in engine.iter_fetch(urls, skip_failed=True):
+                self.save_snapshot(url, html)
+                countries_data.extend(self.parse(html, url))
+        finally:
+            engine.close()
+            self.parallel_parser.close()
+
+        logger.info('Fetched %s countries data from %s pages', len(countries_data), len(urls))
+
+        return countries_data
+
+    def stream_data(self, progress_callback: Optional[ProgressCallback] = None,
+                    cancel_event: Optional[threading.Event] = None,
+                    source: str = DEFAULT_SOURCE) -> Optional[UpsertStats]:
+        """ Fetch, parse and store the target URL concurrently, see StreamPipeline.
+
+            The page is parsed with a StreamScraper while it is downloaded, and the rows
+            are stored in batches while the rest of the page is still coming in. Each
+            batch is compared with the fingerprints stored before the crawl, so that only
+            new and changed countries are written; the stored countries missing from the
+            page are deleted once all of it was parsed.
+
+            Parameters:
+                progress_callback (callable, optional): Called with ('fetch', 0) and with
+                    ('insert', count) after each batch, count being the rows stored so far.
+                cancel_event (threading.Event, optional): When set, the pipeline stops with
+                    CrawlCancelled; the batches stored until then are kept.
+                source (str, optional): Name of the source the data is stored under.
+
+            Returns:
+                Optional[UpsertStats]: The number of inserted, updated and unchanged rows,
+                or None if the page has not changed since the last crawl.
+        """
+        crawler = Crawler(self.target_url, cache=self.http_cache, policy=self.fetch_policy)
+
+        self._report(progress_callback, 'fetch', 0, cancel_event)
+        chunks = crawler.stream_html(chunk_size=self.stream_pipeline.chunk_size)
+        if crawler.not_modified:
+            logger.info('%s not modified since the last crawl', self.target_url)
+            return None
+
+        with metrics.timer('diff'):
+            stored = self.db.get_fingerprints(source)
+        missing = set(stored)
+        stats: UpsertStats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        def write(batch: List[CountryData]) -> None:
+            with metrics.timer('diff'):
+                diff = diff_countries({c.name: stored[c.name] for c in batch if c.name in stored}, batch)
+            changes = diff['added'] + diff['changed']
+            batch_stats: UpsertStats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+            if changes:
+                batch_stats = self.db.insert_countries_data(changes, source)
+            batch_stats['unchanged'] += diff['unchanged']
+            for key, count in batch_stats.items():
+                stats[key] += count   # type: ignore
+                metrics.inc(f'rows_{key}', count)
+
+            # later rows with the same name are compared with this one, as in a staged crawl
+            stored.update((country.name, fingerprint(country)) for country in changes)
+            missing.difference_update(country.name for country in batch)
+            self._report(progress_callback, 'insert', sum(stats.values()), cancel_event)
+
+        try:
+            scraped = self.stream_pipeline.run(
+                self._archived(self.target_url, chunks), StreamScraper(), write, cancel_event
+            )
+            if cancel_event is not None and cancel_event.is_set():
+                raise CrawlCancelled()
+        except BaseException:
+            self.forget_page(self.target_url)
+            raise
+        if not scraped:
+            self.forget_page(self.target_url)
+
+        logger.info('Changes of %s: %s added, %s changed, %s removed, %s unchanged', source,
+                    stats['inserted'], stats['updated'], len(missing), stats['unchanged'])
+        self._delete_missing([name for name in stored if name in missing], source, True, scraped)
+        logger.info('Fetched %s countries data', scraped)
+
+        return stats
+
+    def insert_data(self, data: List[CountryData], source: str = DEFAULT_SOURCE,
+                    delete_missing: bool = True) -> UpsertStats:
+        """ Write the changes between the provided data and the stored countries of a source.
+
+            Each country is compared with the fingerprint stored for it, and only
+            new and changed countries are written. Countries missing from data are deleted.
 
             Parameters:
                 data (list): A list of dictionaries containing the data to insert.
+                source (str, optional): Name of the source the data was scraped from.
+                delete_missing (bool, optional): Whether to delete the stored countries
+                    missing from data; False when data is known to be incomplete.
+
+            Returns:
+                UpsertStats: The number of inserted, updated and unchanged rows.
         """
-        self.db.insert_countries_data(data)
+        with metrics.timer('diff'):
+            diff = diff_countries(self.db.get_fingerprints(source), data)
+        logger.info('Changes of %s: %s added, %s changed, %s removed, %s unchanged', source,
+                    len(diff['added']), len(diff['changed']), len(diff['removed']), diff['unchanged'])
+
+        stats = self.db.insert_countries_data(diff['added'] + diff['changed'], source)
+        stats['unchanged'] += diff['unchanged']
+        for key, count in stats.items():
+            metrics.inc(f'rows_{key}', count)
+
+        self._delete_missing(diff['removed'], source, delete_missing, len(data))
+
+        return stats
+
+    def _delete_missing(self, removed: Sequence[str], source: str, delete_missing: bool, scraped: int) -> None:
+        """Deletes the stored countries missing from a crawl of scraped rows, unless the crawl looks broken."""
+        if not delete_missing:
+            logger.warning('Incomplete crawl of %s, keeping the %s missing countries', source, len(removed))
+        elif scraped:
+            metrics.inc('rows_deleted', self.db.delete_countries(removed, source))
+        else:
+            # an empty crawl is much more likely a broken page than a world without countries
+            logger.warning('No countries scraped, keeping the %s stored ones', len(removed))
 
-    def run(self) -> None:
+    def run(self, progress_callback: Optional[ProgressCallback] = None,
+            cancel_event: Optional[threading.Event] = None) -> None:
         """ Run the data processing pipeline.
 
             This method scrapes data from the target URL,
             extracts relevant information,
             and inserts it into the database.
+            The pipeline stops early if the page has not changed since the last crawl.
+            With pipeline = streaming in the [data_processing] config section the three
+            steps run concurrently, see stream_data().
+
+            Parameters:
+                progress_callback (callable, optional): Called with (stage, count) as the
+                    'fetch', 'parse' and 'insert' stages start, and with ('done', count) at the end.
+                cancel_event (threading.Event, optional): When set, the pipeline stops with
+                    CrawlCancelled before its next stage.
+        """
+        metrics.reset()
+        started_at = time.time()
+        status = 'success'
+        try:
+            with metrics.timer('run'):
+                if self.pipeline == 'streaming':
+                    stats = self.stream_data(progress_callback, cancel_event)
+                    if stats is None:
+                        status = 'not_modified'
+                    self._report(progress_callback, 'done', sum(stats.values()) if stats else 0, None)
+                    return
+
+                data = self.scrape_data(progress_callback, cancel_event)
+                if data is None:
+                    status = 'not_modified'
+                    self._report(progress_callback, 'done', 0, None)
+                    return
+
+                self._report(progress_callback, 'insert', len(data), cancel_event)
+                self.insert_data(data)
+                self._report(progress_callback, 'done', len(data), None)
+        except Exception as e:
+            status = 'cancelled' if isinstance(e, CrawlCancelled) else 'failed'
+            # make sure the next run does not skip the page we failed (or were told not) to store
+            self.forget_page(self.target_url)
+            raise
+        finally:
+            self.parallel_parser.close()
+            self.export_metrics('crawl', status, started_at)
+
+    def run_sources(self, names: Optional[List[str]] = None,
+                    progress_callback: Optional[ProgressCallback] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Dict[str, UpsertStats]:
+        """ Crawl the sources defined in the [source:<name>] config sections in parallel.
+
+            The countries of each source are stored under the source name; a source with
+            pages which failed is upserted without deleting its missing countries.
+
+            Parameters:
+                names (list, optional): The sources to crawl. Defaults to all enabled sources.
+                progress_callback (callable, optional): Called with ('fetch', 0),
+                    ('insert', count) and ('done', count).
+                cancel_event (threading.Event, optional): When set, the pipeline stops with
+                    CrawlCancelled before its next stage.
+
+            Returns:
+                Dict[str, UpsertStats]: The number of inserted, updated and unchanged rows by source.
+        """
+        sources = load_sources('src/config.ini', names)
+
+        metrics.reset()
+        started_at = time.time()
+        status = 'success'
+        all_stats: Dict[str, UpsertStats] = {}
+        try:
+            with metrics.timer('run'):
+                self._report(progress_callback, 'fetch', 0, cancel_event)
+                scheduler = SourceScheduler.from_config('src/config.ini', on_page=self.save_snapshot,
+                                                        policy=self.fetch_policy)
+                results = scheduler.run(sources, cancel_event)
+
+                total = sum(len(result.countries) for result in results)
+                self._report(progress_callback, 'insert', total, cancel_event)
+                for result in results:
+                    all_stats[result.source.name] = self.insert_data(
+                        result.countries, result.source.name, delete_missing=not result.failed_pages
+                    )
+                self._report(progress_callback, 'done', total, None)
+        except Exception as e:
+            status = 'cancelled' if isinstance(e, CrawlCancelled) else 'failed'
+            raise
+        finally:
+            self.export_metrics('sources', status, started_at)
+
+        return all_stats
+
+    def export_metrics(self, mode: str, status: str, started_at: float) -> None:
+        """ Write the metrics of a run to the files configured in the [metrics] section.
+
+            Parameters:
+                mode (str): 'crawl', 'sources' or 'replay'.
+                status (str): How the run ended, e.g. 'success', 'failed' or 'cancelled'.
+                started_at (float): Start time of the run, as a Unix timestamp.
+        """
+        if self.metrics_config.get('enabled', 'yes').lower() not in ('yes', 'true', 'on', '1'):
+            return
+
+        summary = metrics.summary()
+        parse_seconds = summary['timers'].get('parse', {}).get('sum', 0)
+        if parse_seconds:
+            metrics.set('rows_per_second', summary['counters'].get('rows_scraped', 0) / parse_seconds)
+        metrics.set('last_run_timestamp_seconds', started_at)
+        metrics.set('last_run_success', 1 if status in ('success', 'not_modified') else 0)
+
+        try:
+            if self.metrics_config.get('prometheus_file'):
+                metrics.write_prometheus(self.metrics_config['prometheus_file'])
+            if self.metrics_config.get('summary_dir'):
+                file_name = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(started_at))}-{mode}.json"
+                metrics.write_summary(
+                    os.path.join(self.metrics_config['summary_dir'], file_name),
+                    mode=mode,
+                    status=status,
+                    url=self.target_url,
+                    started_at=started_at,
+                    duration=time.time() - started_at,
+                )
+        except OSError as e:
+            logger.error('Failed to write metrics: %s', e)
+
+    def replay(self, snapshot: Optional[SnapshotInfo] = None,
+               progress_callback: Optional[ProgressCallback] = None,
+               cancel_event: Optional[threading.Event] = None) -> UpsertStats:
+        """ Run the parse and insert stages on an archived page instead of the live site.
+
+            Parameters:
+                snapshot (SnapshotInfo, optional): The snapshot to replay, see SnapshotStore.list().
+                    Defaults to the latest snapshot of the target URL.
+                progress_callback (callable, optional): Called with (stage, count) like in run().
+                cancel_event (threading.Event, optional): When set, the replay stops with
+                    CrawlCancelled before its next stage.
+
+            Returns:
+                UpsertStats: The number of inserted, updated and unchanged rows.
+
+            Raises:
+                SnapshotError: If snapshots are disabled or there is nothing to replay.
         """
-        data = self.scrape_data()
-        self.insert_data(data)
+        if self.snapshot_store is None:
+            raise SnapshotError('Snapshots are disabled in the [snapshots] config section')
+        if snapshot is None:
+            snapshot = self.snapshot_store.latest(self.target_url)
+            if snapshot is None:
+                raise SnapshotError(f'No snapshot of {self.target_url}')
+
+        metrics.reset()
+        started_at = time.time()
+        status = 'failed'
+        try:
+            with metrics.timer('run'):
+                self._report(progress_callback, 'fetch', 0, cancel_event)
+                html = self.snapshot_store.load(snapshot['id'])
+                self._report(progress_callback, 'parse', 0, cancel_event)
+
+                data = self.parse(html, f"snapshot {snapshot['id'][:12]}")
+                self._report(progress_callback, 'insert', len(data), cancel_event)
+
+                stats = self.insert_data(data)
+                self._report(progress_callback, 'done', len(data), None)
+            status = 'success'
+        except CrawlCancelled:
+            status = 'cancelled'
+            raise
+        finally:
+            self.parallel_parser.close(cancel_pending=status != 'success')
+            self.export_metrics('replay', status, started_at)
+
+        timers = metrics.summary()['timers']
+        logger.info('Replayed snapshot %s of %s: %s countries, parse %.1f ms, insert %.1f ms',
+                    snapshot['id'][:12], snapshot['url'], len(data),
+                    timers['parse']['sum'] * 1000 if 'parse' in timers else 0,
+                    timers['insert']['sum'] * 1000 if 'insert' in timers else 0)
+        return stats
+
+    def replay_all(self, snapshots: List[SnapshotInfo],
+                   progress_callback: Optional[ProgressCallback] = None,
+                   cancel_event: Optional[threading.Event] = None) -> List[UpsertStats]:
+        """ Replay many archived pages, e.g. to rebuild the table after the scraper changed.
+
+            The snapshots are parsed in parallel by a ParallelParser, whose workers read
+            them from the store, and stored one after the other in the given order.
+
+            Parameters:
+                snapshots (list): The snapshots to replay, oldest first, see SnapshotStore.list().
+                progress_callback (callable, optional): Called with ('insert', count) for every
+                    snapshot and with ('done', count) at the end.
+                cancel_event (threading.Event, optional): When set, the replay stops with
+                    CrawlCancelled before the next snapshot.
+
+            Returns:
+                List[UpsertStats]: The number of inserted, updated and unchanged rows per snapshot.
+        """
+        if self.snapshot_store is None:
+            raise SnapshotError('Snapshots are disabled in the [snapshots] config section')
+
+        metrics.reset()
+        started_at = time.time()
+        status = 'failed'
+        all_stats: List[UpsertStats] = []
+        total = 0
+        try:
+            with metrics.timer('run'):
+                parsed = self.parallel_parser.parse_snapshots(
+                    self.snapshot_store.snapshot_dir, [snapshot['id'] for snapshot in snapshots]
+                )
+                # parse time: the wait for the rows of each snapshot, the part of the
+                # parsing which the inserts did not hide
+                wait_start = time.perf_counter()
+                for data in parsed:
+                    metrics.observe('parse', time.perf_counter() - wait_start)
+                    metrics.inc('rows_scraped', len(data))
+                    total += len(data)
+                    self._report(progress_callback, 'insert', len(data), cancel_event)
+                    all_stats.append(self.insert_data(data))
+                    wait_start = time.perf_counter()
+                self._report(progress_callback, 'done', total, None)
+            status = 'success'
+        except CrawlCancelled:
+            status = 'cancelled'
+            raise
+        finally:
+            self.parallel_parser.close(cancel_pending=status != 'success')
+            self.export_metrics('replay', status, started_at)
+
+        timers = metrics.summary()['timers']
+        logger.info('Replayed %s snapshots: %s countries in %.1f s, parse %.1f ms, insert %.1f ms',
+                    len(snapshots), total, time.time() - started_at,
+                    timers['parse']['sum'] * 1000 if 'parse' in timers else 0,
+                    timers['insert']['sum'] * 1000 if 'insert' in timers else 0)
+        return all_stats
@@ -0,0 +1,191 @@
+"""Module: http_cache
+
+    This module provides an on-disk HTTP response cache for the Crawler.
+
+    Responses are keyed by URL and stored together with their ETag/Last-Modified
+    validators, so that later requests can be revalidated with a conditional GET.
+    Entries younger than the TTL are served without any request at all, and the
+    cache is kept below a maximum size by evicting the least recently used entries.
+
+    Example:
+        >>> cache = HttpCache('data/http_cache', ttl=3600, max_size=50 * 1024 * 1024)
+        >>> crawler = Crawler('https://example.com', cache=cache)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from src.utils.config_loader import load_config
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('http_cache', logging.INFO)
+
+
+class HttpCache:
+    """A size-bounded LRU cache of HTTP responses stored on disk."""
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir: str, ttl: float = 3600, max_size: int = 50 * 1024 * 1024) -> None:
+        """ Initializes a new HttpCache.
+
+            Args:
+                cache_dir (str): Directory holding the cached bodies and the index file.
+                ttl (float): Number of seconds an entry is served without revalidation.
+                max_size (int): Maximum total size of the cached bodies, in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index: Dict[str, dict] = self._load_index()
+
+    @classmethod
+    def from_config(cls, config_file: str, section: str = 'http_cache') -> Optional['HttpCache']:
+        """ Creates a HttpCache from the given config section.
+
+            Returns:
+                Optional[HttpCache]: The cache, or None if caching is disabled.
+        """
+        cache_config = load_config(config_file, section)
+        if cache_config.get('enabled', 'yes').lower() not in ('yes', 'true', 'on', '1'):
+            return None
+
+        return cls(
+            cache_dir=cache_config.get('cache_dir', 'data/http_cache'),
+            ttl=float(cache_config.get('ttl', 3600)),
+            max_size=int(float(cache_config.get('max_size_mb', 50)) * 1024 * 1024),
+        )
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.html')
+
+    def _load_index(self) -> Dict[str, dict]:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning('Ignoring unreadable cache index %s: %s', index_path, e)
+            return {}
+
+    def _save_index(self) -> None:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+
+    def get(self, url: str) -> Optional[dict]:
+        """ Returns the cache entry for url, or None if url is not cached.
+
+            The entry holds the validators ('etag', 'last_modified') and the
+            'stored_at' timestamp of the cached response.
+        """
+        with self._lock:
+            entry = self._index.get(self._key(url))
+            if entry is None or not os.path.exists(self._body_path(self._key(url))):
+                return None
+            return dict(entry)
+
+    def is_fresh(self, entry: dict) -> bool:
+        """Checks whether an entry is younger than the TTL and can be used without revalidation."""
+        return time.time() - entry['stored_at'] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> Dict[str, str]:
+        """Builds the If-None-Match/If-Modified-Since headers for revalidating an entry."""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read_body(self, url: str) -> str:
+        """Reads the cached body of url and marks the entry as recently used."""
+        key = self._key(url)
+        with self._lock:
+            with open(self._body_path(key), 'r', encoding='utf-8') as f:
+                body = f.read()
+            if key in self._index:
+                self._index[key]['last_access'] = time.time()
+                self._save_index()
+        return body
+
+    def refresh(self, url: str) -> None:
+        """Restarts the TTL of an entry, after the server confirmed it is not modified."""
+        key = self._key(url)
+        with self._lock:
+            if key in self._index:
+                now = time.time()
+                self._index[key]['stored_at'] = now
+                self._index[key]['last_access'] = now
+                self._save_index()
+
+    def store(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """ Stores a response body together with its validators.
+
+            Args:
+                url (str): The URL of the response.
+                body (str): The response body.
+                etag (str, optional): Value of the ETag response header.
+                last_modified (str, optional): Value of the Last-Modified response header.
+        """
+        key = self._key(url)
+        data = body.encode('utf-8')
+        now = time.time()
+
+        with self._lock:
+            with open(self._body_path(key), 'wb') as f:
+                f.write(data)
+            self._index[key] = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'stored_at': now,
+                'last_access': now,
+                'size': len(data),
+            }
+            self._evict()
+            self._save_index()
+
+    def invalidate(self, url: str) -> None:
+        """Removes url from the cache, so the next request downloads it again."""
+        key = self._key(url)
+        with self._lock:
+            self._remove(key)
+            self._save_index()
+
+    def _remove(self, key: str) -> None:
+        self._index.pop(key, None)
+        try:
+            os.remove(self._body_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in max_size."""
+        total_size = sum(entry['size'] for entry in self._index.values())
+        by_last_access = sorted(self._index, key=lambda k: self._index[k]['last_access'])
+
+        for key in by_last_access:
+            if total_size <= self.max_size:
+                break
+            total_size -= self._index[key]['size']
+            logger.debug('Evicting %s from the HTTP cache', self._index[key]['url'])
+            self._remove(key)
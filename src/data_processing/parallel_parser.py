@@ -0,0 +1,289 @@
+"""Module: parallel_parser
+
+    This module provides a ParallelParser, which parses HTML on a pool of processes.
+
+    Scraping is pure-Python, CPU-bound work which holds the GIL, so threads do not
+    make it faster; separate processes do. ParallelParser keeps one
+    ProcessPoolExecutor and offers three ways of splitting the work:
+
+        submit()/parse_pages()  one job per page, for many pages
+        parse_snapshots()       one job per archived page, read by the worker itself,
+                                so that no HTML is sent between the processes
+        parse_large()           one page split into shards of row elements
+
+    Workers send back the rows as plain tuples, never parser objects; they are turned
+    into the plan's row type (CountryData) in the calling process.
+
+    Example:
+        >>> with ParallelParser(workers=4) as parser:
+        ...     for countries_data in parser.parse_pages(pages):
+        ...         print(len(countries_data))
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from src.data_processing.scraper import ExtractionPlan, Scraper, ScraperError, SimpleSelector
+from src.data_processing.snapshot_store import SnapshotError, SnapshotStore
+from src.data_processing.sources import get_plan
+from src.data_processing.stream_scraper import StreamScraper
+from src.shared_types import CountryData
+from src.utils.config_loader import load_config
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('parallel_parser', logging.INFO)
+
+# rows of a page, as plain tuples, and the parse time in seconds
+ParsedRows = Tuple[List[tuple], float]
+
+_shard_plans = {}
+
+
+def parse_page(plan_name: str, html: str, scraper_engine: str = 'tree',
+               parser_backend: str = 'auto') -> ParsedRows:
+    """Extracts the rows of one page. Runs in a worker process."""
+    start = time.perf_counter()
+    plan = get_plan(plan_name)
+    if scraper_engine == 'stream':
+        rows = StreamScraper(html, plan=plan).get_countries_data()
+    else:
+        rows = Scraper(html, backend=parser_backend, plan=plan).get_countries_data()
+    return [tuple(row) for row in rows], time.perf_counter() - start
+
+
+def parse_snapshot(snapshot_dir: str, snapshot_id: str, plan_name: str, scraper_engine: str = 'tree',
+                   parser_backend: str = 'auto') -> ParsedRows:
+    """Reads an archived page and extracts its rows. Runs in a worker process.
+
+        A snapshot which cannot be read or scraped is logged and gives no rows, so that
+        one damaged page does not stop the re-parsing of a whole archive.
+    """
+    try:
+        html = SnapshotStore(snapshot_dir).load(snapshot_id)
+        return parse_page(plan_name, html, scraper_engine, parser_backend)
+    except (SnapshotError, ScraperError) as e:
+        logger.error('Cannot parse snapshot %s: %s', snapshot_id[:12], e)
+        return [], 0.0
+
+
+def _shard_plan(plan_name: str) -> ExtractionPlan:
+    """The plan without row ancestor and threshold, for parsing a fragment of a page."""
+    if plan_name not in _shard_plans:
+        plan = get_plan(plan_name)
+        _shard_plans[plan_name] = ExtractionPlan(
+            row_selector=plan.row_selector.split()[-1],
+            fields=plan.fields,
+            row_type=plan.row_type,
+        )
+    return _shard_plans[plan_name]
+
+
+def parse_shard(plan_name: str, html: str, parser_backend: str = 'auto') -> ParsedRows:
+    """Extracts the rows of a page fragment cut by ParallelParser.parse_large(). Runs in a worker process."""
+    start = time.perf_counter()
+    rows = Scraper(html, backend=parser_backend, plan=_shard_plan(plan_name)).get_countries_data()
+    return [tuple(row) for row in rows], time.perf_counter() - start
+
+
+def row_start_pattern(plan: ExtractionPlan) -> Optional[Pattern]:
+    """Builds a regular expression matching the start tags of the rows of a plan.
+
+        Returns:
+            Optional[Pattern]: The pattern, or None if the row selector is not a simple
+            tag/class selector, in which case pages cannot be sharded.
+    """
+    row = plan.row_selector.split()[-1]
+    if not SimpleSelector.is_simple(row):
+        return None
+    selector = SimpleSelector(row)
+    if selector.tag is None or selector.id or selector.nth:
+        return None
+
+    # a class attribute containing every class of the selector as a whole word
+    lookaheads = ''.join(
+        rf'''(?=[^>]*\bclass\s*=\s*["'][^"']*(?<![\w-]){re.escape(cls)}(?![\w-]))'''
+        for cls in sorted(selector.classes)
+    )
+    return re.compile(rf'<{re.escape(selector.tag)}\b{lookaheads}[^>]*>', re.IGNORECASE)
+
+
+class ParallelParser:
+    """Parses pages, archived pages or shards of a large page on a process pool."""
+
+    def __init__(self, workers: int = 0, scraper_engine: str = 'tree', parser_backend: str = 'auto',
+                 plan_name: str = 'countries', shard_rows: int = 2000) -> None:
+        """ Initializes a new ParallelParser. The worker processes are started on first use.
+
+            Args:
+                workers (int): Number of worker processes, 0 for one per CPU.
+                scraper_engine (str): 'tree' or 'stream', see DataProcessor.create_scraper().
+                parser_backend (str): Parser of the 'tree' engine.
+                plan_name (str): Default extraction plan, see sources.PLANS.
+                shard_rows (int): Number of rows per shard of parse_large().
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.scraper_engine = scraper_engine
+        self.parser_backend = parser_backend
+        self.plan_name = plan_name
+        self.shard_rows = shard_rows
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config_file: str) -> 'ParallelParser':
+        """Creates a ParallelParser from the [crawler] and [data_processing] config sections."""
+        crawler_config = load_config(config_file, 'crawler')
+        data_processing_config = load_config(config_file, 'data_processing')
+        return cls(
+            workers=int(crawler_config.get('parse_workers', 0)),
+            scraper_engine=data_processing_config.get('scraper_engine', 'tree'),
+            parser_backend=data_processing_config.get('parser_backend', 'auto'),
+            shard_rows=int(crawler_config.get('shard_rows', 2000)),
+        )
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # 'spawn': the parent runs fetch and logging threads, which fork does not cope with
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def close(self, cancel_pending: bool = False) -> None:
+        """Stops the worker processes."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=cancel_pending)
+                self._executor = None
+
+    def __enter__(self) -> 'ParallelParser':
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self.close(cancel_pending=exc_type is not None)
+
+    def to_rows(self, parsed: ParsedRows, plan_name: Optional[str] = None) -> List[CountryData]:
+        """Turns the tuples sent back by a worker into rows of the plan's row type."""
+        plan = get_plan(plan_name or self.plan_name)
+        rows, _ = parsed
+        return [plan.make_row(values) for values in rows]
+
+    def _chunksize(self, jobs: int) -> int:
+        # several small jobs per message, but enough messages to keep every worker busy
+        return max(1, jobs // (self.workers * 4))
+
+    def submit(self, html: str, plan_name: Optional[str] = None) -> 'Future[ParsedRows]':
+        """Schedules the parsing of one page; see to_rows() for the result."""
+        return self.executor.submit(
+            parse_page, plan_name or self.plan_name, html, self.scraper_engine, self.parser_backend
+        )
+
+    def parse_pages(self, pages: Iterable[str]) -> Iterator[List[CountryData]]:
+        """ Parses pages in parallel.
+
+            Yields:
+                List[CountryData]: The rows of each page, in the order of pages.
+
+            Raises:
+                ScraperError: If a page cannot be scraped.
+        """
+        pages = list(pages)
+        count = len(pages)
+        results = self.executor.map(
+            parse_page,
+            [self.plan_name] * count, pages, [self.scraper_engine] * count, [self.parser_backend] * count,
+            chunksize=self._chunksize(count),
+        )
+        for parsed in results:
+            yield self.to_rows(parsed)
+
+    def parse_snapshots(self, snapshot_dir: str, snapshot_ids: Iterable[str]) -> Iterator[List[CountryData]]:
+        """ Parses archived pages in parallel, each worker reading its pages from the store.
+
+            Args:
+                snapshot_dir (str): Directory of the SnapshotStore.
+                snapshot_ids (Iterable[str]): The snapshots to parse.
+
+            Yields:
+                List[CountryData]: The rows of each snapshot, in the order of snapshot_ids;
+                empty for a snapshot which cannot be read or scraped.
+        """
+        snapshot_ids = list(snapshot_ids)
+        count = len(snapshot_ids)
+        results = self.executor.map(
+            parse_snapshot,
+            [snapshot_dir] * count, snapshot_ids, [self.plan_name] * count,
+            [self.scraper_engine] * count, [self.parser_backend] * count,
+            chunksize=self._chunksize(count),
+        )
+        for parsed in results:
+            yield self.to_rows(parsed)
+
+    def parse_large(self, html: str) -> List[CountryData]:
+        """ Parses a single large page by splitting its rows across the workers.
+
+            The page is cut at the start tags of the row elements into shards of
+            shard_rows rows, which are parsed with the row selector alone: the rows are
+            assumed to all lie inside the row ancestor of the plan. The threshold value
+            is read in this process, by parsing just the top of the page.
+
+            Falls back to parsing the page as a whole if it is small or if the plan's
+            rows cannot be located by their start tag.
+
+            Returns:
+                List[CountryData]: The rows of the page, in document order.
+
+            Raises:
+                ScraperError: If the page cannot be scraped.
+        """
+        plan = get_plan(self.plan_name)
+        pattern = row_start_pattern(plan)
+        starts = [match.start() for match in pattern.finditer(html)] if pattern else []
+
+        if len(starts) <= self.shard_rows:
+            return self.to_rows(self.submit(html).result())
+
+        threshold = StreamScraper(html, plan=plan).find_threshold()
+        cuts = starts[::self.shard_rows] + [len(html)]
+        shards = [html[begin:end] for begin, end in zip(cuts, cuts[1:])]
+
+        count = len(shards)
+        results = self.executor.map(parse_shard, [self.plan_name] * count, shards, [self.parser_backend] * count)
+
+        rows = []
+        for parsed in results:
+            rows.extend(
+                row for row in self.to_rows(parsed)
+                if threshold is None or row[plan.threshold_index] > threshold
+            )
+        logger.debug('Parsed %s rows in %s shards', len(rows), count)
+        return rows
+
+
+if __name__ == '__main__':
+    # Compare the sharded parse of a page with the plain one:
+    # python -m src.data_processing.parallel_parser page.html [workers]
+    import sys
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        page_html = f.read()
+
+    start_time = time.perf_counter()
+    reference = Scraper(page_html).get_countries_data()
+    print(f'single process: {len(reference)} rows in {time.perf_counter() - start_time:.2f}s')
+
+    with ParallelParser(workers=int(sys.argv[2]) if len(sys.argv) > 2 else 0, shard_rows=500) as parallel:
+        parallel.parse_large(page_html)   # start the workers
+        start_time = time.perf_counter()
+        sharded = parallel.parse_large(page_html)
+        print(f'{parallel.workers} workers:    {len(sharded)} rows in {time.perf_counter() - start_time:.2f}s, '
+              f"{'OK' if sharded == reference else 'DIFFERS'}")
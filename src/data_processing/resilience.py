@@ -0,0 +1,253 @@
+"""Module: resilience
+
+    This module provides the building blocks of a polite and fault tolerant fetch layer:
+
+        TokenBucket      limits the request rate, allowing short bursts
+        HostRateLimiter  one token bucket per host
+        RetryPolicy      jittered exponential backoff, honoring Retry-After
+        CircuitBreaker   stops sending requests to a host which keeps failing
+        FetchPolicy      all of the above plus the connect/read timeouts, as used by Crawler
+
+    A FetchPolicy holds the per-host state, so it is meant to be shared by every
+    Crawler (and thread) of a run.
+
+    Example:
+        >>> policy = FetchPolicy.from_config('src/config.ini')
+        >>> crawler = Crawler(url, policy=policy)
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import requests
+
+from src.utils.config_loader import load_config
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('resilience', logging.INFO)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit breaker is open."""
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class TokenBucket:
+    """A thread-safe token bucket: rate tokens per second, at most burst tokens saved up."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """ Initializes a full bucket.
+
+            Args:
+                rate (float): Tokens added per second, 0 for no limit.
+                burst (int): Capacity of the bucket, i.e. the longest burst of requests.
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """ Takes a token, sleeping until one is available.
+
+            Returns:
+                float: The number of seconds waited.
+        """
+        if self.rate <= 0 and not self._not_before:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._not_before)
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # the token is taken now; a negative balance is the debt later callers wait for
+                self._tokens -= 1
+                if self._tokens < 0:
+                    start = max(start, now - self._tokens / self.rate)
+            wait = start - now
+
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def pause(self, seconds: float) -> None:
+        """Delays all requests by at least seconds, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, created on first use."""
+
+    def __init__(self, rate: float = 0, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, host: str) -> float:
+        """Waits for a request slot of host and returns the number of seconds waited."""
+        return self.bucket(host).acquire()
+
+    def pause(self, host: str, seconds: float) -> None:
+        self.bucket(host).pause(seconds)
+
+
+class RetryPolicy:
+    """Decides whether and when a failed request is retried."""
+
+    RETRY_STATUSES: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0) -> None:
+        """ Initializes a new RetryPolicy.
+
+            Args:
+                max_retries (int): Retries after the first attempt, 0 to never retry.
+                backoff_base (float): Upper bound of the first delay, in seconds; doubled per retry.
+                backoff_max (float): Upper bound of any delay, including Retry-After, in seconds.
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parses a Retry-After header, given in seconds or as an HTTP date."""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(retry_at.timestamp() - time.time(), 0.0)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """ Returns the seconds to wait before retry number attempt + 1.
+
+            Without Retry-After the delay is drawn uniformly from [0, base * 2^attempt]
+            ("full jitter"), so that many clients failing together do not retry together.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+        After failure_threshold consecutive failures the circuit of a host opens and
+        requests to it fail immediately. After reset_timeout seconds one trial request
+        is let through (half open): its success closes the circuit, its failure opens
+        it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # host -> (consecutive failures, time the circuit opened or None)
+        self._hosts: Dict[str, Tuple[int, Optional[float]]] = {}
+        self._trials: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, host: str) -> bool:
+        """ Checks whether a request to host may be sent.
+
+            Returns:
+                bool: True if the request is the trial request of a half open circuit;
+                its outcome must be recorded, or the trial released with release_trial().
+
+            Raises:
+                CircuitOpenError: If the circuit of host is open.
+        """
+        if self.failure_threshold <= 0:
+            return False
+
+        with self._lock:
+            failures, opened_at = self._hosts.get(host, (0, None))
+            if opened_at is None:
+                return False
+            if time.monotonic() - opened_at >= self.reset_timeout and not self._trials.get(host):
+                self._trials[host] = True   # half open: let this one request through
+                return True
+        raise CircuitOpenError(f'Circuit open for {host} after {failures} consecutive failures')
+
+    def release_trial(self, host: str) -> None:
+        """Ends a trial request which neither succeeded nor failed (e.g. a 429), so that another one may be sent."""
+        with self._lock:
+            self._trials.pop(host, None)
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._hosts.pop(host, None)
+            self._trials.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            failures, opened_at = self._hosts.get(host, (0, None))
+            failures += 1
+            if self._trials.pop(host, False) or (opened_at is None and 0 < self.failure_threshold <= failures):
+                opened_at = time.monotonic()
+                logger.warning('Circuit opened for %s after %s consecutive failures', host, failures)
+            self._hosts[host] = (failures, opened_at)
+
+
+class FetchPolicy:
+    """Timeouts, rate limits, retries and circuit breaking of the requests of a crawl."""
+
+    def __init__(self, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 host_rate_limit: float = 0, host_burst: int = 1,
+                 retry: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None) -> None:
+        """ Initializes a new FetchPolicy.
+
+            Args:
+                connect_timeout (float): Seconds to wait for the TCP/TLS connection.
+                read_timeout (float): Seconds to wait for data from the server.
+                host_rate_limit (float): Requests per second per host, 0 for no limit.
+                host_burst (int): Requests per host which may be sent back to back.
+                retry (RetryPolicy, optional): Defaults to RetryPolicy().
+                circuit_breaker (CircuitBreaker, optional): Defaults to CircuitBreaker().
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.rate_limiter = HostRateLimiter(host_rate_limit, host_burst)
+        self.retry = retry or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+    @classmethod
+    def from_config(cls, config_file: str, section: str = 'crawler') -> 'FetchPolicy':
+        """Creates a FetchPolicy from the given config section."""
+        crawler_config = load_config(config_file, section)
+        return cls(
+            connect_timeout=float(crawler_config.get('connect_timeout', 3.05)),
+            read_timeout=float(crawler_config.get('read_timeout', 10)),
+            host_rate_limit=float(crawler_config.get('host_rate_limit', 0)),
+            host_burst=int(crawler_config.get('host_burst', 1)),
+            retry=RetryPolicy(
+                max_retries=int(crawler_config.get('max_retries', 3)),
+                backoff_base=float(crawler_config.get('backoff_base', 0.5)),
+                backoff_max=float(crawler_config.get('backoff_max', 30)),
+            ),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=int(crawler_config.get('circuit_failure_threshold', 5)),
+                reset_timeout=float(crawler_config.get('circuit_reset_timeout', 60)),
+            ),
+        )
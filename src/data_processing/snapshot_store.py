@@ -0,0 +1,181 @@
+"""Module: snapshot_store
+
+    This module provides an archive of crawled HTML pages, for replaying crawls offline.
+
+    Every page body is gzip-compressed and stored once under its SHA-256 hash
+    (content addressed), so identical pages crawled again take no extra space.
+    Each crawl appends one metadata record (URL, time, hash, sizes) to a JSON lines
+    log, which keeps the full history of what was fetched and when.
+
+    Unlike the HttpCache, snapshots are never evicted: they are the input of
+    DataProcessor.replay(), which re-runs the parse and insert stages without network,
+    e.g. to benchmark the pipeline on a fixed input or to re-parse old pages after
+    the scraper has changed.
+
+    Example:
+        >>> store = SnapshotStore('data/snapshots')
+        >>> snapshot = store.save('https://example.com', html)
+        >>> html = store.load(snapshot['id'])
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.shared_types import SnapshotInfo
+from src.utils.config_loader import load_config
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('snapshot_store', logging.INFO)
+
+
+class SnapshotError(Exception):
+    """Custom exception for errors related to SnapshotStore."""
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class SnapshotStore:
+    """A content-addressed, gzip-compressed archive of crawled pages."""
+
+    LOG_FILE = 'snapshots.jsonl'
+
+    def __init__(self, snapshot_dir: str, compress_level: int = 6) -> None:
+        """ Initializes a new SnapshotStore.
+
+            Args:
+                snapshot_dir (str): Directory holding the compressed bodies and the metadata log.
+                compress_level (int): gzip compression level, 1 (fastest) to 9 (smallest).
+        """
+        self.snapshot_dir = snapshot_dir
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(self.snapshot_dir, 'objects'), exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config_file: str, section: str = 'snapshots') -> Optional['SnapshotStore']:
+        """ Creates a SnapshotStore from the given config section.
+
+            Returns:
+                Optional[SnapshotStore]: The store, or None if snapshots are disabled.
+        """
+        snapshot_config = load_config(config_file, section)
+        if snapshot_config.get('enabled', 'yes').lower() not in ('yes', 'true', 'on', '1'):
+            return None
+
+        return cls(
+            snapshot_dir=snapshot_config.get('snapshot_dir', 'data/snapshots'),
+            compress_level=int(snapshot_config.get('compress_level', 6)),
+        )
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.snapshot_dir, 'objects', digest[:2], f'{digest}.html.gz')
+
+    def save(self, url: str, html: str) -> SnapshotInfo:
+        """ Archives a crawled page.
+
+            The body is only written if no snapshot with the same content exists yet,
+            the metadata record is appended in any case.
+
+            Args:
+                url (str): The URL the page was fetched from.
+                html (str): The page body.
+
+            Returns:
+                SnapshotInfo: The metadata record of the snapshot.
+        """
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f'{path}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(gzip.compress(data, self.compress_level))
+                os.replace(tmp_path, path)
+
+            snapshot: SnapshotInfo = {
+                'id': digest,
+                'url': url,
+                'fetched_at': time.time(),
+                'size': len(data),
+                'compressed_size': os.path.getsize(path),
+            }
+            with open(os.path.join(self.snapshot_dir, self.LOG_FILE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(snapshot) + '\n')
+
+        logger.debug('Saved snapshot %s of %s', digest[:12], url)
+        return snapshot
+
+    def list(self, url: Optional[str] = None) -> List[SnapshotInfo]:
+        """ Returns the metadata of all crawls, oldest first.
+
+            Args:
+                url (str, optional): Only return the snapshots of this URL.
+        """
+        log_path = os.path.join(self.snapshot_dir, self.LOG_FILE)
+        snapshots: List[SnapshotInfo] = []
+        try:
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    try:
+                        snapshot = json.loads(line)
+                    except ValueError:
+                        logger.warning('Ignoring unreadable line %s of %s', line_number, log_path)
+                        continue
+                    if url is None or snapshot['url'] == url:
+                        snapshots.append(snapshot)
+        except FileNotFoundError:
+            pass
+        return snapshots
+
+    def latest(self, url: Optional[str] = None) -> Optional[SnapshotInfo]:
+        """Returns the most recent snapshot (of url), or None if there is none."""
+        snapshots = self.list(url)
+        return snapshots[-1] if snapshots else None
+
+    def find(self, snapshot_id: str) -> SnapshotInfo:
+        """ Returns the latest snapshot whose id starts with snapshot_id.
+
+            Raises:
+                SnapshotError: If no snapshot, or several different ones, match.
+        """
+        matches: Dict[str, SnapshotInfo] = {}
+        for snapshot in self.list():
+            if snapshot['id'].startswith(snapshot_id):
+                matches[snapshot['id']] = snapshot
+
+        if not matches:
+            raise SnapshotError(f"No snapshot '{snapshot_id}'")
+        if len(matches) > 1:
+            raise SnapshotError(f"Snapshot id '{snapshot_id}' is ambiguous")
+        return next(iter(matches.values()))
+
+    def load(self, snapshot_id: str) -> str:
+        """ Reads the page body of a snapshot.
+
+            Args:
+                snapshot_id (str): The snapshot id, or an unambiguous prefix of it.
+
+            Raises:
+                SnapshotError: If the snapshot does not exist or its body is damaged.
+        """
+        digest = snapshot_id if len(snapshot_id) == 64 else self.find(snapshot_id)['id']
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                data = gzip.decompress(f.read())
+        except (OSError, EOFError) as e:
+            raise SnapshotError(f"Cannot read snapshot '{digest}': {e}") from e
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise SnapshotError(f"Snapshot '{digest}' is corrupted")
+        return data.decode('utf-8')
@@ -0,0 +1,175 @@
+"""Module: source_scheduler
+
+    This module provides a SourceScheduler, which crawls several sources in one run.
+
+    The pages of all sources are fetched concurrently on a thread pool (through a
+    CrawlEngine, so the per-host limits and the fetch policy apply), each source
+    throttled by its own rate limit. Every fetched page is handed to a ParallelParser right away, so the
+    CPU-bound parsing of one page overlaps with the fetching of the next ones and
+    uses more than one core.
+
+    Example:
+        >>> scheduler = SourceScheduler.from_config('src/config.ini')
+        >>> for result in scheduler.run(load_sources('src/config.ini')):
+        ...     print(result.source.name, len(result.countries))
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional
+
+import requests
+
+from src.data_processing.crawl_engine import CrawlEngine
+from src.data_processing.parallel_parser import ParallelParser, parse_page
+from src.data_processing.resilience import FetchPolicy, TokenBucket
+from src.data_processing.scraper import ScraperError
+from src.data_processing.sources import SourceDefinition, get_plan
+from src.shared_types import CountryData
+from src.utils.config_loader import load_config
+from src.utils.metrics import metrics
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('source_scheduler', logging.INFO)
+
+# called with (url, html) for every fetched page, e.g. to archive it
+PageCallback = Callable[[str, str], None]
+
+
+class SourceResult(NamedTuple):
+    """The countries scraped from one source"""
+    source: SourceDefinition
+    countries: List[CountryData]
+    # pages which could not be fetched or parsed; the countries are incomplete if > 0
+    failed_pages: int
+
+
+class SourceScheduler:
+    """Fetches and parses the pages of several sources in parallel."""
+
+    def __init__(self, max_workers: int = 8, max_per_host: int = 4, parse_workers: int = 0,
+                 scraper_engine: str = 'tree', parser_backend: str = 'auto',
+                 on_page: Optional[PageCallback] = None, policy: Optional[FetchPolicy] = None) -> None:
+        """ Initializes a new SourceScheduler.
+
+            Args:
+                max_workers (int): Maximum number of concurrent fetches overall.
+                max_per_host (int): Maximum number of concurrent fetches against a single host.
+                parse_workers (int): Number of parse processes, 0 for one per CPU.
+                scraper_engine (str): 'tree' or 'stream', see DataProcessor.create_scraper().
+                parser_backend (str): Parser of the 'tree' engine.
+                on_page (callable, optional): Called with (url, html) for every fetched page.
+                policy (FetchPolicy, optional): Timeouts, per-host rate limits, retries and
+                    circuit breaker of the fetches. Defaults to FetchPolicy().
+        """
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.scraper_engine = scraper_engine
+        self.parser_backend = parser_backend
+        self.on_page = on_page
+        self.policy = policy if policy is not None else FetchPolicy()
+
+    @classmethod
+    def from_config(cls, config_file: str, on_page: Optional[PageCallback] = None,
+                    policy: Optional[FetchPolicy] = None) -> 'SourceScheduler':
+        """Creates a SourceScheduler from the [crawler] and [data_processing] config sections.
+
+            The fetch policy is read from [crawler] as well, unless one is given.
+        """
+        crawler_config = load_config(config_file, 'crawler')
+        data_processing_config = load_config(config_file, 'data_processing')
+        return cls(
+            max_workers=int(crawler_config.get('max_workers', 8)),
+            max_per_host=int(crawler_config.get('max_per_host', 4)),
+            parse_workers=int(crawler_config.get('parse_workers', 0)),
+            scraper_engine=data_processing_config.get('scraper_engine', 'tree'),
+            parser_backend=data_processing_config.get('parser_backend', 'auto'),
+            on_page=on_page,
+            policy=policy or FetchPolicy.from_config(config_file, 'crawler'),
+        )
+
+    def run(self, sources: List[SourceDefinition],
+            cancel_event: Optional[threading.Event] = None) -> List[SourceResult]:
+        """ Crawls all pages of the given sources.
+
+            A page which cannot be fetched or parsed is logged and counted in the
+            failed_pages of its source; the other pages and sources are not affected.
+
+            Args:
+                sources (List[SourceDefinition]): The sources to crawl.
+                cancel_event (threading.Event, optional): When set, no further pages are fetched.
+
+            Returns:
+                List[SourceResult]: One result per source, in the order of sources.
+        """
+        jobs = [(source, url) for source in sources for url in source.urls()]
+        limiters = {source.name: TokenBucket(source.rate_limit) for source in sources}
+        engine = CrawlEngine(max_workers=self.max_workers, max_per_host=self.max_per_host, policy=self.policy)
+
+        # a single page is parsed in this process, starting a worker would cost more than it saves
+        parser = None
+        if len(jobs) > 1:
+            parser = ParallelParser(
+                workers=min(self.parse_workers, len(jobs)),
+                scraper_engine=self.scraper_engine,
+                parser_backend=self.parser_backend,
+            )
+
+        def fetch(source: SourceDefinition, url: str) -> Optional[Future]:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            limiters[source.name].acquire()
+            html = engine.fetch(url)
+            if self.on_page:
+                self.on_page(url, html)
+
+            if parser is None:
+                future: Future = Future()
+                future.set_result(parse_page(source.plan, html, self.scraper_engine, self.parser_backend))
+                return future
+            return parser.submit(html, source.plan)
+
+        countries = {source.name: [] for source in sources}
+        failed_pages = {source.name: 0 for source in sources}
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as fetch_pool:
+                fetches = [fetch_pool.submit(fetch, source, url) for source, url in jobs]
+
+                for (source, url), fetched in zip(jobs, fetches):
+                    try:
+                        parsed = fetched.result()
+                        if parsed is None:   # cancelled
+                            failed_pages[source.name] += 1
+                            continue
+                        rows, parse_seconds = parsed.result()
+                        countries_data = [get_plan(source.plan).make_row(values) for values in rows]
+                    except (requests.exceptions.RequestException, ScraperError) as e:
+                        logger.error('Failed to crawl %s from %s: %s', source.name, url, e)
+                        failed_pages[source.name] += 1
+                        continue
+                    except Exception as e:
+                        # e.g. a broken process pool: only this page (and its source) failed
+                        logger.error('Failed to crawl %s from %s: %s: %s', source.name, url, type(e).__name__, e)
+                        failed_pages[source.name] += 1
+                        continue
+
+                    metrics.observe('parse', parse_seconds)
+                    metrics.inc('rows_scraped', len(countries_data))
+                    countries[source.name].extend(countries_data)
+        finally:
+            if parser is not None:
+                parser.close(cancel_pending=True)
+            engine.close()
+
+        results = [
+            SourceResult(source, countries[source.name], failed_pages[source.name])
+            for source in sources
+        ]
+        for result in results:
+            logger.info('Source %s: %s countries from %s pages, %s failed', result.source.name,
+                        len(result.countries), len(result.source.urls()), result.failed_pages)
+        return results
@@ -0,0 +1,133 @@
+"""Module: sources
+
+    This module provides the registry of the sites countries data is crawled from.
+
+    Sources are defined in src/config.ini, one section per source:
+
+        [source:scrapethissite]
+        url = https://www.scrapethissite.com/pages/simple/
+        # optional page numbers filled into a {page} placeholder of the url, e.g. 1-5
+        pages =
+        # name of the extraction plan, see PLANS
+        plan = countries
+        # maximum requests per second against this source (0 = unlimited)
+        rate_limit = 2
+        enabled = yes
+
+    Extraction plans are listed by name in PLANS, so that a source definition (and a
+    parse job sent to another process) only has to carry the plan name. New plans
+    are added to PLANS here, not at runtime: the parse worker processes import this
+    module afresh and would not know them.
+
+    Example:
+        >>> for source in load_sources('src/config.ini'):
+        ...     print(source.name, source.urls())
+"""
+
+import configparser
+import logging
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+from src.data_processing.scraper import COUNTRIES_PLAN, ExtractionPlan
+from src.utils.config_loader import ConfigError
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('sources', logging.INFO)
+
+SECTION_PREFIX = 'source:'
+
+# extraction plans by name
+PLANS: Dict[str, ExtractionPlan] = {
+    'countries': COUNTRIES_PLAN,
+}
+
+
+def get_plan(name: str) -> ExtractionPlan:
+    """Returns the extraction plan registered under name.
+
+        Raises:
+            ConfigError: If there is no such plan.
+    """
+    try:
+        return PLANS[name]
+    except KeyError:
+        raise ConfigError(f"Unknown extraction plan '{name}', expected one of: {', '.join(PLANS)}") from None
+
+
+class SourceDefinition(NamedTuple):
+    """A site to crawl countries data from"""
+    name: str
+    url: str
+    pages: str = ''
+    plan: str = 'countries'
+    rate_limit: float = 0
+
+    def urls(self) -> List[str]:
+        """Expands the {page} placeholder of the url into one URL per page.
+
+            pages is a comma separated list of page numbers and ranges, e.g. '1-3,7'.
+        """
+        if not self.pages:
+            return [self.url]
+
+        page_numbers: List[int] = []
+        for part in self.pages.split(','):
+            first, _, last = part.strip().partition('-')
+            page_numbers.extend(range(int(first), int(last or first) + 1))
+        return [self.url.format(page=page) for page in page_numbers]
+
+
+def load_sources(config_file: str, names: Optional[List[str]] = None) -> List[SourceDefinition]:
+    """ Reads the source definitions from the [source:<name>] config sections.
+
+        Args:
+            config_file (str): Path to the configuration file.
+            names (List[str], optional): Only return these sources, also if they are disabled.
+                Defaults to all enabled sources.
+
+        Returns:
+            List[SourceDefinition]: The sources, in config file order.
+
+        Raises:
+            ConfigError: If the file is missing, a definition is invalid, or a requested
+            source is not defined.
+    """
+    if not os.path.exists(config_file):
+        raise ConfigError(f"Error: CONFIGURATION FILE '{os.path.abspath(config_file)}' not found")
+
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    sources = []
+    for section in config.sections():
+        if not section.startswith(SECTION_PREFIX):
+            continue
+        name = section[len(SECTION_PREFIX):].strip()
+        options = config[section]
+
+        if names is None and not options.getboolean('enabled', fallback=True):
+            continue
+        if names is not None and name not in names:
+            continue
+
+        try:
+            source = SourceDefinition(
+                name=name,
+                url=options['url'],
+                pages=options.get('pages', '').strip(),
+                plan=options.get('plan', 'countries'),
+                rate_limit=float(options.get('rate_limit', 0) or 0),
+            )
+            source.urls()
+        except (KeyError, ValueError) as e:
+            raise ConfigError(f"Invalid source definition [{section}]: {e}") from e
+        get_plan(source.plan)
+        sources.append(source)
+
+    missing = set(names or []) - {source.name for source in sources}
+    if missing:
+        raise ConfigError(f"Undefined sources: {', '.join(sorted(missing))}")
+
+    logger.debug('Loaded %s sources', len(sources))
+    return sources
@@ -0,0 +1,193 @@
+"""Module: stream_pipeline
+
+    This module provides a StreamPipeline, which fetches, parses and stores a page
+    at the same time instead of one step after the other:
+
+        fetch thread   reads the HTTP body in chunks            -> chunk queue
+        parse thread   feeds them to a StreamScraper, batches
+                       the completed rows                       -> batch queue
+        caller         writes each batch, e.g. to the database
+
+    Both queues are bounded. A stage which falls behind blocks the one before it
+    (backpressure), so at most queue_size chunks and queue_size batches wait in
+    memory, whatever the size of the page, and a run takes about as long as its
+    slowest stage rather than the sum of the three.
+
+    An error in one stage stops the others and is raised by run().
+
+    Example:
+        >>> pipeline = StreamPipeline(batch_size=500)
+        >>> chunks = crawler.stream_html(chunk_size=pipeline.chunk_size)
+        >>> pipeline.run(chunks, StreamScraper(), lambda batch: db.insert_countries_data(batch))
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from src.data_processing.stream_scraper import StreamScraper
+from src.shared_types import CountryData
+from src.utils.config_loader import load_config
+from src.utils.metrics import metrics
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('stream_pipeline', logging.INFO)
+
+# called with each batch of rows, in the thread calling run()
+BatchWriter = Callable[[List[CountryData]], Any]
+
+# put into a queue after the last item
+_END = object()
+
+
+class _Failed:
+    """Put into a queue instead of the next item when the producing stage failed."""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+class StreamPipeline:
+    """Runs the fetch, parse and write stages of one page concurrently."""
+
+    def __init__(self, chunk_size: int = 65536, batch_size: int = 500, queue_size: int = 8,
+                 poll_interval: float = 0.1) -> None:
+        """ Initializes a new StreamPipeline.
+
+            Args:
+                chunk_size (int): Bytes read from the connection at a time, see Crawler.stream_html().
+                batch_size (int): Rows handed to the writer at a time.
+                queue_size (int): Chunks, and batches, buffered between two stages.
+                poll_interval (float): Seconds between checks for a stopped pipeline or a
+                    cancellation while a stage waits on a queue.
+        """
+        self.chunk_size = chunk_size
+        self.batch_size = max(batch_size, 1)
+        self.queue_size = max(queue_size, 1)
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def from_config(cls, config_file: str, section: str = 'data_processing') -> 'StreamPipeline':
+        """Creates a StreamPipeline from the stream_* keys of the given config section."""
+        pipeline_config = load_config(config_file, section)
+        return cls(
+            chunk_size=int(pipeline_config.get('stream_chunk_size', 65536)),
+            batch_size=int(pipeline_config.get('stream_batch_size', 500)),
+            queue_size=int(pipeline_config.get('stream_queue_size', 8)),
+        )
+
+    def run(self, chunks: Iterable[str], scraper: StreamScraper, write: BatchWriter,
+            cancel_event: Optional[threading.Event] = None) -> int:
+        """ Streams the chunks of a page through the scraper into write().
+
+            Args:
+                chunks (Iterable[str]): The page, e.g. Crawler.stream_html(). Read in a thread of its own.
+                scraper (StreamScraper): A fresh scraper; it is fed in a thread of its own.
+                write (callable): Called with each batch of rows, in the calling thread.
+                cancel_event (threading.Event, optional): When set, the pipeline stops
+                    before the next batch and run() returns early.
+
+            Returns:
+                int: The number of rows handed to write().
+
+            Raises:
+                Exception: The first error of a stage, e.g. a RequestException of the
+                    fetch, a ScraperError of the parse or any error of write().
+        """
+        stop = threading.Event()
+        chunk_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        batch_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        batches = self._parse(scraper, self._consume(chunk_queue, stop))
+        threads = [
+            threading.Thread(target=self._produce, args=(chunks, chunk_queue, stop),
+                             name='stream-fetch', daemon=True),
+            threading.Thread(target=self._produce, args=(batches, batch_queue, stop),
+                             name='stream-parse', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        written = 0
+        try:
+            for batch in self._consume(batch_queue, stop, cancel_event):
+                write(batch)
+                written += len(batch)
+        finally:
+            # lets the other stages finish their current step and return
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        return written
+
+    def _put(self, target: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """Puts item into target, waiting while it is full. Returns False if the pipeline stopped."""
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=self.poll_interval)
+                return True
+            except queue.Full:
+                metrics.inc('stream_queue_full')
+        return False
+
+    def _produce(self, items: Iterable, target: queue.Queue, stop: threading.Event) -> None:
+        """Body of a stage thread: moves items into target, then the end (or failure) marker."""
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not self._put(target, item, stop):
+                    return
+            self._put(target, _END, stop)
+        except BaseException as e:   # handed to the next stage, which raises it
+            self._put(target, _Failed(e), stop)
+        finally:
+            # closes e.g. the HTTP response of an abandoned download
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    def _consume(self, source: queue.Queue, stop: threading.Event,
+                 cancel_event: Optional[threading.Event] = None) -> Iterator[Any]:
+        """Yields the items of source until the end marker; raises the error of a failed stage."""
+        while not stop.is_set():
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                item = source.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+
+    def _parse(self, scraper: StreamScraper, chunks: Iterable[str]) -> Iterator[List[CountryData]]:
+        """Feeds the chunks to the scraper and yields its rows in batches of batch_size."""
+        batch: List[CountryData] = []
+        rows = 0
+        parse_seconds = 0.0
+
+        for chunk in chunks:
+            start = time.perf_counter()
+            batch.extend(scraper.feed(chunk))
+            parse_seconds += time.perf_counter() - start
+
+            while len(batch) >= self.batch_size:
+                rows += self.batch_size
+                yield batch[:self.batch_size]
+                batch = batch[self.batch_size:]
+
+        start = time.perf_counter()
+        batch.extend(scraper.close())
+        parse_seconds += time.perf_counter() - start
+
+        metrics.observe('parse', parse_seconds)
+        metrics.inc('rows_scraped', rows + len(batch))
+        if batch:
+            yield batch
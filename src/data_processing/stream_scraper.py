@@ -0,0 +1,268 @@
+"""Module: stream_scraper
+
+    This module provides a StreamScraper class, an incremental alternative to Scraper.
+
+    Instead of building a complete BeautifulSoup tree, StreamScraper feeds the HTML
+    through the standard library html.parser event API, chunk by chunk, and emits
+    a CountryData row as soon as the closing tag of each 'div.country' is seen.
+    Only the currently open elements and the row being parsed are kept in memory.
+
+    It supports the same get_countries_data() contract as Scraper and is driven by the
+    same ExtractionPlan, as long as the plan only uses selectors that can be matched
+    on the stack of open elements: "ancestor row" for the rows, simple selectors for
+    the fields and a child-combinator chain for the threshold.
+
+    Example:
+        >>> scraper = StreamScraper(response.iter_content(chunk_size=8192, decode_unicode=True))
+        >>> for country in scraper.iter_countries_data():
+        ...     print(country.name)
+"""
+
+import logging
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from src.data_processing.scraper import (
+    COUNTRIES_PLAN, ExtractionPlan, ScraperError, SimpleSelector, to_float
+)
+from src.shared_types import CountryData
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('stream_scraper', logging.ERROR)
+
+# elements which never have a closing tag
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+
+
+class _Element:
+    """An open element on the parser stack."""
+
+    __slots__ = ('tag', 'id', 'classes', 'nth', 'children')
+
+    def __init__(self, tag: str, attrs: Dict[str, Optional[str]], nth: int) -> None:
+        self.tag = tag
+        self.id = attrs.get('id')
+        self.classes = frozenset((attrs.get('class') or '').split())
+        self.nth = nth
+        self.children = 0
+
+    def matches(self, selector: SimpleSelector) -> bool:
+        return selector.matches(self.tag, self.id, self.classes, self.nth)
+
+
+class _RowsParser(HTMLParser):
+    """HTMLParser which collects the field texts of each row while the document is fed."""
+
+    def __init__(self, plan: ExtractionPlan) -> None:
+        super().__init__(convert_charrefs=True)
+
+        try:
+            row_ancestor, row = plan.row_selector.split()
+            self.row_ancestor = SimpleSelector(row_ancestor)
+            self.row = SimpleSelector(row)
+            self.fields = [(field.name, SimpleSelector(field.css_selector)) for field in plan.fields]
+            self.threshold_path = (
+                [SimpleSelector(sel) for sel in plan.threshold_selector.split('>')]
+                if plan.threshold_selector else []
+            )
+        except ValueError as err:
+            raise ScraperError(f"Row selector '{plan.row_selector}' is not supported for streaming") from err
+
+        self.stack: List[_Element] = [_Element('#document', {}, 1)]
+        self.in_row_ancestor = 0   # number of open elements matching the row ancestor
+
+        self.row_depth: Optional[int] = None
+        self.row_fields: Dict[str, str] = {}
+        # open text captures: field name -> (stack depth, collected text parts)
+        self.captures: Dict[str, tuple] = {}
+
+        self.threshold_depth: Optional[int] = None
+        self.threshold_text: List[str] = []
+        self.threshold: Optional[str] = None
+
+        self.rows: List[Dict[str, str]] = []
+
+    def _matches_threshold(self) -> bool:
+        path = self.threshold_path
+        if not path or len(self.stack) <= len(path):
+            return False
+        return all(el.matches(sel) for sel, el in zip(path, self.stack[-len(path):]))
+
+    def handle_starttag(self, tag, attrs):
+        parent = self.stack[-1]
+        parent.children += 1
+        element = _Element(tag, dict(attrs), parent.children)
+
+        if tag in VOID_ELEMENTS:
+            return
+
+        self.stack.append(element)
+        depth = len(self.stack)
+
+        if self.row_depth is None:
+            if self.in_row_ancestor and element.matches(self.row):
+                self.row_depth = depth
+                self.row_fields = {}
+        else:
+            for name, selector in self.fields:
+                if name not in self.row_fields and name not in self.captures and element.matches(selector):
+                    self.captures[name] = (depth, [])
+                    break
+
+        if element.matches(self.row_ancestor):
+            self.in_row_ancestor += 1
+
+        if self.threshold is None and self.threshold_depth is None and self._matches_threshold():
+            self.threshold_depth = depth
+
+    def handle_startendtag(self, tag, attrs):
+        parent = self.stack[-1]
+        parent.children += 1
+
+    def handle_data(self, data):
+        for _, parts in self.captures.values():
+            parts.append(data)
+        if self.threshold_depth is not None:
+            self.threshold_text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+
+        # close the innermost open element with this tag, and any unclosed ones inside it
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                break
+        else:
+            return   # stray end tag
+
+        while len(self.stack) > index:
+            self._close_element()
+
+    def _close_element(self) -> None:
+        depth = len(self.stack)
+        element = self.stack.pop()
+
+        for name, (capture_depth, parts) in list(self.captures.items()):
+            if capture_depth == depth:
+                self.row_fields[name] = ''.join(parts).strip()
+                del self.captures[name]
+
+        if self.threshold_depth == depth:
+            self.threshold = ''.join(self.threshold_text).strip()
+            self.threshold_depth = None
+
+        if self.row_depth == depth:
+            self.rows.append(self.row_fields)
+            self.row_depth = None
+            self.captures = {}
+
+        if element.matches(self.row_ancestor):
+            self.in_row_ancestor -= 1
+
+
+class StreamScraper:
+    """Class for incrementally scraping countries data from a stream of HTML chunks."""
+
+    def __init__(self, source: Union[str, Iterable[str], None] = None, plan: ExtractionPlan = COUNTRIES_PLAN) -> None:
+        """Initializes a new StreamScraper object.
+
+            Args:
+                source (str | Iterable[str], optional): The HTML content, or an iterable of
+                    HTML chunks (e.g. response.iter_content(decode_unicode=True)).
+                    May be omitted when the chunks are pushed with feed().
+                plan (ExtractionPlan, optional): What to extract. Defaults to COUNTRIES_PLAN.
+        """
+        self.source = [source] if isinstance(source, str) else source
+        self.plan = plan
+        self._parser = _RowsParser(plan)
+        self._threshold: Optional[float] = None
+        # rows waiting for the threshold value to be known
+        self._pending: List[Dict[str, str]] = []
+
+    def _convert(self, texts: Dict[str, str]) -> List[Any]:
+        values = []
+        for field in self.plan.fields:
+            if field.name not in texts:
+                raise ScraperError(f"Cannot find '{field.css_selector}' in row")
+            values.append(field.convert(texts[field.name]))
+        return values
+
+    def _take_rows(self) -> List[CountryData]:
+        """Converts the rows completed so far, once the threshold value is known."""
+        parser = self._parser
+        self._pending.extend(parser.rows)
+        parser.rows = []
+
+        if self.plan.threshold_selector and self._threshold is None:
+            if parser.threshold is None:
+                return []
+            self._threshold = to_float(parser.threshold)
+
+        countries_data = []
+        for texts in self._pending:
+            try:
+                values = self._convert(texts)
+            except ScraperError as err:
+                logger.error(err)
+                continue
+
+            if self._threshold is None or values[self.plan.threshold_index] > self._threshold:
+                countries_data.append(self.plan.make_row(values))
+        self._pending = []
+
+        return countries_data
+
+    def feed(self, chunk: str) -> List[CountryData]:
+        """Feeds the next chunk of HTML and returns the countries completed by it."""
+        self._parser.feed(chunk)
+        return self._take_rows()
+
+    def close(self) -> List[CountryData]:
+        """Finishes parsing and returns the remaining countries.
+
+            Raises:
+                ScraperError: If the threshold value was not found in the document.
+        """
+        self._parser.close()
+        countries_data = self._take_rows()
+        if self.plan.threshold_selector and self._threshold is None:
+            raise ScraperError(f"Cannot find '{self.plan.threshold_selector}' in document")
+        return countries_data
+
+    def find_threshold(self, chunk_size: int = 65536) -> Optional[float]:
+        """Parses the source only as far as needed to know the threshold value of the plan.
+
+            Returns:
+                Optional[float]: The threshold value, or None if the plan has none.
+
+            Raises:
+                ScraperError: If the threshold value is not found in the document.
+        """
+        if not self.plan.threshold_selector:
+            return None
+        if self.source is None:
+            raise ScraperError('StreamScraper has no source to read from')
+
+        for chunk in self.source:
+            for start in range(0, len(chunk), chunk_size):
+                self._parser.feed(chunk[start:start + chunk_size])
+                if self._parser.threshold is not None:
+                    return to_float(self._parser.threshold)
+        raise ScraperError(f"Cannot find '{self.plan.threshold_selector}' in document")
+
+    def iter_countries_data(self) -> Iterator[CountryData]:
+        """Yields the countries data while the source is being consumed."""
+        if self.source is None:
+            raise ScraperError('StreamScraper has no source to read from')
+
+        for chunk in self.source:
+            yield from self.feed(chunk)
+        yield from self.close()
+
+    def get_countries_data(self) -> List[CountryData]:
+        """Scrape data for all countries from the source."""
+        return list(self.iter_countries_data())
@@ -0,0 +1,53 @@
+"""Module: change_detection
+
+    This module fingerprints scraped country rows and computes what changed since the last crawl.
+
+    A fingerprint is a SHA-1 over the values of a row, stored next to the row in the
+    database. Comparing the fingerprints of a new crawl with the stored ones tells which
+    countries were added, changed or removed, so only that delta has to be written.
+
+    Example:
+        >>> diff = diff_countries(db.get_fingerprints(), countries_data)
+        >>> db.insert_countries_data(diff['added'] + diff['changed'])
+"""
+
+import hashlib
+from typing import Dict, List
+
+from src.shared_types import CountriesDiff, CountryData
+
+def fingerprint(country: CountryData) -> str:
+    """Returns a stable hex digest over the fields of a country row."""
+    payload = '\x1f'.join(map(repr, country))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def diff_countries(stored: Dict[str, str], scraped: List[CountryData]) -> CountriesDiff:
+    """Compares freshly scraped countries with the stored fingerprints.
+
+        Args:
+            stored (Dict[str, str]): Fingerprint of each stored country, by name.
+            scraped (List[CountryData]): The countries of the current crawl.
+
+        Returns:
+            CountriesDiff: The added and changed rows, the names of removed countries
+                and the number of unchanged rows.
+    """
+    diff: CountriesDiff = {'added': [], 'changed': [], 'removed': [], 'unchanged': 0}
+    seen = set()
+
+    for country in scraped:
+        name = country.name
+        seen.add(name)
+
+        stored_fingerprint = stored.get(name)
+        if name not in stored:
+            diff['added'].append(country)
+        elif stored_fingerprint != fingerprint(country):
+            diff['changed'].append(country)
+        else:
+            diff['unchanged'] += 1
+
+    diff['removed'] = [name for name in stored if name not in seen]
+
+    return diff
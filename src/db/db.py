@@ -1,24 +1,46 @@
 """ module db.py"""
 
+import datetime
+import hashlib
 import logging
-from typing import List, Optional
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import mysql.connector
+from mysql.connector import pooling
 
+from src.db.change_detection import fingerprint
+from src.db.storage import Storage, metadata_cache
+from src.utils.metrics import metrics
 from src.utils.setup_logging import setup_logger
 from src.utils.config_loader import load_config
-from src.shared_types import CountryData
+from src.shared_types import DEFAULT_SOURCE, CountryData, UpsertStats
 
-logger = setup_logger("db", logging.DEBUG)
+logger = setup_logger("db", logging.INFO)
 
+# connection pools shared by all DB instances, keyed by pool name
+_pools: Dict[str, pooling.MySQLConnectionPool] = {}
+_pools_lock = threading.Lock()
 
-class DB:
+
+class DB(Storage):
     """Connects to a MySQL database and provides methods for creating
         and populating a 'countries' table.
+
+        Connections come from a connection pool shared by all DB instances with the
+        same settings. Each operation checks a connection out, pings it (reconnecting
+        if the server dropped it) and returns it to the pool when done.
     """
 
+    # MySQL has no NULLS FIRST/LAST, and sorts NULLs as the smallest values anyway
+    NULLS_ORDER = False
+
     def __init__(self, config_file: str, section: str = "mysql") -> None:
-        """ Initializes a connection to the MySQL database specified in the configuration file.
+        """ Initializes the connection pool to the MySQL database specified in the configuration file.
 
             Args:
                 config_file (str):
@@ -30,8 +52,24 @@ class DB:
 
         mysql_config = load_config(config_file, section=section)
 
+        db_options = load_config(config_file, section='db')
+        self.batch_size = int(db_options.get('batch_size', 1000))
+        # loads of at least this many rows go through LOAD DATA LOCAL INFILE, 0 disables it
+        self.local_infile_threshold = int(db_options.get('local_infile_threshold', 0))
+        if self.local_infile_threshold:
+            mysql_config['allow_local_infile'] = True
+
+        pool_size = int(db_options.get('pool_size', 5))
+        # seconds to wait for a free connection when all of them are checked out
+        self.pool_timeout = float(db_options.get('pool_timeout', 10))
+        # column names and last update time, shared by the DB instances of the same database
+        self.metadata = metadata_cache(
+            f"mysql:{mysql_config.get('host', '')}:{mysql_config.get('port', '')}/{mysql_config.get('database', '')}",
+            float(db_options.get('metadata_ttl', 0)),
+        )
+
         try:
-            self.db = mysql.connector.connect(**mysql_config)
+            self.pool = self._get_pool(mysql_config, pool_size)
             logger.info("Successfully connected to MySQL database '%s'", mysql_config["database"])
         except mysql.connector.Error as e:
             error_msg = f"Failed to connect to MySQL database: {e}"
@@ -40,57 +78,454 @@ class DB:
         # finally:
         #     logger.debug("MySQL config data: %s", mysql_config)
 
+    @staticmethod
+    def _get_pool(mysql_config: dict, pool_size: int) -> pooling.MySQLConnectionPool:
+        """Returns the shared pool for mysql_config, creating it on first use."""
+        settings = sorted(mysql_config.items()) + [('pool_size', pool_size)]
+        pool_name = 'countries_' + hashlib.sha1(repr(settings).encode('utf-8')).hexdigest()[:16]
+
+        with _pools_lock:
+            if pool_name not in _pools:
+                _pools[pool_name] = pooling.MySQLConnectionPool(
+                    pool_name=pool_name,
+                    pool_size=pool_size,
+                    **mysql_config,
+                )
+            return _pools[pool_name]
+
+    @contextmanager
+    def _connection(self) -> Iterator[pooling.PooledMySQLConnection]:
+        """Checks a live connection out of the pool for the duration of the block."""
+        deadline = time.monotonic() + self.pool_timeout
+        while True:
+            try:
+                connection = self.pool.get_connection()
+                break
+            except mysql.connector.errors.PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
+        try:
+            # transparently replace connections dropped by the server ("MySQL server has gone away")
+            connection.ping(reconnect=True, attempts=3, delay=1)
+            yield connection
+        finally:
+            connection.close()  # returns the connection to the pool
+
     def create_countries_table(self) -> None:
         """Creates a 'countries' table in the database if it doesn't already exist."""
 
-        query = """
+        query = f"""
             CREATE TABLE IF NOT EXISTS countries (
                 id INT AUTO_INCREMENT PRIMARY KEY,
+                source VARCHAR(50) NOT NULL DEFAULT '{DEFAULT_SOURCE}',
                 name VARCHAR(50),
                 capital VARCHAR(50),
-                population VARCHAR(50),
-                area VARCHAR(50),
+                population BIGINT,
+                area DOUBLE,
+                fingerprint CHAR(40),
                 created_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                updated_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                updated_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                UNIQUE KEY uq_countries_source_name (source, name),
+                KEY idx_countries_name (name),
+                KEY idx_countries_capital (capital),
+                KEY idx_countries_population (population),
+                KEY idx_countries_area (area),
+                KEY idx_countries_updated_at (updated_at)
             )
         """
 
-        with self.db.cursor() as cursor:
+        with self._connection() as connection, connection.cursor() as cursor:
             try:
                 cursor.execute(query)
-                self.db.commit()
+                cursor.execute(self.HISTORY_TABLE_QUERY)
+                connection.commit()
             except mysql.connector.Error as e:
                 logger.error('Error executing [%s]: %s', query, e)
+        self._changed(schema=True)
+
+    # versions of the countries, range partitioned by month of valid_from (see _add_history_partitions);
+    # the as-of index holds every column read by select_as_of(), so those reads never touch the rows
+    HISTORY_TABLE_QUERY = """
+        CREATE TABLE IF NOT EXISTS countries_history (
+            id BIGINT NOT NULL AUTO_INCREMENT,
+            source VARCHAR(50) NOT NULL,
+            name VARCHAR(50) NOT NULL,
+            capital VARCHAR(50),
+            population BIGINT,
+            area DOUBLE,
+            fingerprint CHAR(40),
+            valid_from DATETIME(6) NOT NULL,
+            valid_to DATETIME(6) NOT NULL,
+            PRIMARY KEY (id, valid_from),
+            KEY idx_countries_history_name (source, name, valid_to),
+            KEY idx_countries_history_as_of (source, valid_to, valid_from, name, capital, population, area, fingerprint)
+        )
+        PARTITION BY RANGE COLUMNS (valid_from) (
+            PARTITION p_future VALUES LESS THAN (MAXVALUE)
+        )
+    """
+
+    @staticmethod
+    def _add_history_partitions(cursor, months: int = 2) -> None:
+        """Splits a partition per month off p_future, for this and the next months.
+
+            A partition holds the versions written in its month, so that reads as of a
+            time skip the partitions of later months, and old months can be dropped
+            or archived as a whole.
+        """
+        cursor.execute("""
+            SELECT PARTITION_NAME FROM INFORMATION_SCHEMA.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'countries_history'
+        """)
+        existing = {name for (name,) in cursor.fetchall()}
+
+        month = datetime.date.today().replace(day=1)
+        partitions = []
+        for _ in range(months):
+            next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+            name = f'p{month:%Y%m}'
+            if name not in existing:
+                partitions.append(f"PARTITION {name} VALUES LESS THAN ('{next_month:%Y-%m-%d}')")
+            month = next_month
+
+        if partitions:
+            cursor.execute(f"""
+                ALTER TABLE countries_history REORGANIZE PARTITION p_future INTO (
+                    {', '.join(partitions)},
+                    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+            logger.info('Added %s partitions to countries_history', len(partitions))
+
+    @staticmethod
+    def _has_index(cursor, index_name: str) -> bool:
+        cursor.execute("""
+            SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'countries' AND INDEX_NAME = %s
+        """, (index_name,))
+        (count,) = cursor.fetchone()
+        return count > 0
+
+    @staticmethod
+    def _column_type(cursor, column_name: str) -> Optional[str]:
+        """Returns the DATA_TYPE of a column of 'countries', or None if it does not exist."""
+        cursor.execute("""
+            SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'countries' AND COLUMN_NAME = %s
+        """, (column_name,))
+        row = cursor.fetchone()
+        return row[0].lower() if row else None
+
+    def migrate_countries_table(self) -> None:
+        """Brings a 'countries' table created by an older version up to date.
+
+            - adds the unique key on 'name', after removing the duplicate rows appended
+              by earlier crawls (the newest row of each country is kept)
+            - adds the 'source' column; existing rows belong to the 'default' source,
+              and the unique key becomes (source, name)
+            - adds the 'fingerprint' column used for change detection
+            - converts the VARCHAR 'population'/'area' columns to BIGINT/DOUBLE and indexes
+              them; values which are not numbers become NULL
+            - adds the indexes used for filtering and sorting the table view
+            - adds the partitions of the current month to 'countries_history', and a
+              current version for the countries which have none
+
+            The ALTER TABLE statements commit implicitly, so a failed migration cannot be
+            rolled back. Each step checks whether it is still needed instead, and the next
+            start picks the migration up again at the step which failed.
+        """
+        dedupe_query = """
+            DELETE older FROM countries AS older
+            JOIN countries AS newer ON older.name = newer.name AND older.id < newer.id
+        """
+
+        with self._connection() as connection, connection.cursor() as cursor:
+            step = 'unique name key'
+            try:
+                has_source = self._column_type(cursor, 'source') is not None
+
+                if not has_source and not self._has_index(cursor, 'uq_countries_name'):
+                    cursor.execute(dedupe_query)
+                    logger.info('Removed %s duplicate country rows', cursor.rowcount)
+                    cursor.execute("ALTER TABLE countries ADD UNIQUE KEY uq_countries_name (name)")
+
+                step = 'source column'
+                if not has_source:
+                    cursor.execute(f"""
+                        ALTER TABLE countries
+                            ADD COLUMN source VARCHAR(50) NOT NULL DEFAULT '{DEFAULT_SOURCE}' AFTER id,
+                            DROP INDEX uq_countries_name,
+                            ADD UNIQUE KEY uq_countries_source_name (source, name),
+                            ADD KEY idx_countries_name (name)
+                    """)
+                    logger.info("Added the 'source' column")
+
+                step = 'fingerprint column'
+                if self._column_type(cursor, 'fingerprint') is None:
+                    cursor.execute("ALTER TABLE countries ADD COLUMN fingerprint CHAR(40) AFTER area")
+
+                step = 'numeric population/area'
+                if self._column_type(cursor, 'population') in ('varchar', 'char', 'text'):
+                    # 'updated_at = updated_at' keeps ON UPDATE CURRENT_TIMESTAMP from
+                    # dating every row, and its first history version, to the migration
+                    cursor.execute("""
+                        UPDATE countries SET population = REPLACE(population, ',', ''), updated_at = updated_at
+                    """)
+                    cursor.execute("""
+                        UPDATE countries SET population = NULL, updated_at = updated_at
+                        WHERE population NOT REGEXP '^[0-9]+$'
+                    """)
+                    cursor.execute("""
+                        UPDATE countries SET area = NULL, updated_at = updated_at
+                        WHERE area NOT REGEXP '^-?[0-9]+([.][0-9]+)?$'
+                    """)
+                    cursor.execute("""
+                        ALTER TABLE countries
+                            MODIFY population BIGINT NULL,
+                            MODIFY area DOUBLE NULL,
+                            ADD KEY idx_countries_population (population),
+                            ADD KEY idx_countries_area (area)
+                    """)
+                    logger.info('Converted population/area columns to numeric types')
+
+                step = 'filter indexes'
+                for index_name, column in (('idx_countries_capital', 'capital'),
+                                           ('idx_countries_updated_at', 'updated_at')):
+                    if not self._has_index(cursor, index_name):
+                        cursor.execute(f"ALTER TABLE countries ADD KEY {index_name} ({column})")
+
+                connection.commit()
+            except mysql.connector.Error as e:
+                # only undoes the UPDATEs of the current step, the ALTERs before it are committed
+                connection.rollback()
+                logger.error('Error migrating countries table at step [%s]: %s', step, e)
+
+            try:
+                self._add_history_partitions(cursor)
+                seed_query, seed_params = self._seed_history_query()
+                cursor.execute(seed_query, seed_params)
+                if cursor.rowcount:
+                    logger.info('Added %s countries to the history', cursor.rowcount)
+                connection.commit()
+            except mysql.connector.Error as e:
+                connection.rollback()
+                logger.error('Error migrating countries_history table: %s', e)
+        self._changed(schema=True)
+
+    UPSERT_QUERY = """
+        INSERT INTO countries (source, name, capital, population, area, fingerprint)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            capital = VALUES(capital),
+            population = VALUES(population),
+            area = VALUES(area),
+            fingerprint = VALUES(fingerprint)
+    """
 
+    @staticmethod
+    def _count_changes(rows: int, existing: int, affected: int) -> UpsertStats:
+        """Splits the result of an upsert into inserted/updated/unchanged counts.
 
-    def insert_countries_data(self, countries_data: List[CountryData]) -> None:
-        """Inserts a list of country data into the 'countries' table.
+            With INSERT ... ON DUPLICATE KEY UPDATE, MySQL reports 1 affected row per
+            inserted row, 2 per updated row and 0 per row which was left unchanged.
+        """
+        inserted = rows - existing
+        updated = max(affected - inserted, 0) // 2
+        return {'inserted': inserted, 'updated': updated, 'unchanged': existing - updated}
+
+    def _count_existing(self, cursor, source: str, names: Sequence[str]) -> int:
+        """Counts how many of the given names already have a row of the source."""
+        placeholders = ', '.join(['%s'] * len(names))
+        cursor.execute(
+            f'SELECT COUNT(*) FROM countries WHERE source = %s AND name IN ({placeholders})',
+            [source, *names],
+        )
+        (existing,) = cursor.fetchone()
+        return existing
+
+    @metrics.timed('insert')
+    def insert_countries_data(self, countries_data: List[CountryData], source: str = DEFAULT_SOURCE) -> UpsertStats:
+        """Inserts or updates a list of country data in the 'countries' table.
+
+            Rows are matched on the source and the country name. Existing rows are only
+            touched (and their updated_at moved) when one of their values actually changed,
+            and each change is recorded in 'countries_history'.
 
             Args:
                 countries_data (List[CountryData]):
-                    A list of dictionaries where each dictionary represents a country
-                    with keys 'name', 'capital', 'population', and 'area'.
-        """
+                    A list of CountryData rows with 'name', 'capital', 'population', and 'area'.
+                source (str, optional): Name of the source the data was scraped from.
 
-        query = """
-            INSERT INTO countries (name, capital, population, area)
-            VALUES (%s, %s, %s, %s)
+            Returns:
+                UpsertStats: The number of inserted, updated and unchanged rows.
         """
-
         countries_data_tupples = [
-            (country["name"], country["capital"], country["population"], country["area"])
+            (source, *country, fingerprint(country))
             for country in countries_data
         ]
 
-        with self.db.cursor() as cursor:
+        now = datetime.datetime.now()
+
+        if self.local_infile_threshold and len(countries_data_tupples) >= self.local_infile_threshold:
+            try:
+                return self._load_data_infile(countries_data_tupples, source, now)
+            except (mysql.connector.Error, OSError) as e:
+                logger.warning('LOAD DATA LOCAL INFILE failed, falling back to batched upsert: %s', e)
+
+        stats: UpsertStats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        with self._connection() as connection, connection.cursor() as cursor:
             try:
-                cursor.executemany(query, countries_data_tupples)
-                self.db.commit()
-                logger.info("Successfully inserted: %s rows.", len(countries_data))
+                for start in range(0, len(countries_data_tupples), self.batch_size):
+                    batch = countries_data_tupples[start:start + self.batch_size]
+                    names = [row[1] for row in batch]
+                    existing = self._count_existing(cursor, source, names)
+                    cursor.executemany(self.UPSERT_QUERY, batch)
+                    batch_stats = self._count_changes(len(batch), existing, cursor.rowcount)
+                    self._record_history(cursor, source, f"({', '.join(['%s'] * len(names))})", names, now)
+                    for key in stats:
+                        stats[key] += batch_stats[key]  # type: ignore
+                with metrics.timer('db_commit'):
+                    connection.commit()
+                if stats['inserted'] or stats['updated']:
+                    self._changed()
+                logger.info("Successfully upserted: %s inserted, %s updated, %s unchanged.",
+                            stats['inserted'], stats['updated'], stats['unchanged'])
+            except mysql.connector.Error as e:
+                connection.rollback()
+                logger.error('Error executing [%s]: %s', self.UPSERT_QUERY, e)
+
+        return stats
+
+    @staticmethod
+    def _escape_infile_value(value) -> str:
+        """Escapes a value for the default LOAD DATA field/line format."""
+        return (
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+        )
+
+    def _record_history(self, cursor, source: str, names_sql: str, names_params: Sequence,
+                        now: datetime.datetime) -> None:
+        """Brings 'countries_history' up to date with the changes of the given countries, see _history_queries()."""
+        for query, params in self._history_queries(source, names_sql, names_params, now):
+            cursor.execute(query, params)
+
+    def _load_data_infile(self, rows: List[Tuple], source: str, now: datetime.datetime) -> UpsertStats:
+        """Bulk loads rows through a staging table filled with LOAD DATA LOCAL INFILE.
+
+            Requires local_infile to be enabled on the MySQL server.
+        """
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv', delete=False) as f:
+            for row in rows:
+                f.write('\t'.join(self._escape_infile_value(value) for value in row) + '\n')
+            infile_path = f.name
+
+        try:
+            with self._connection() as connection, connection.cursor() as cursor:
+                try:
+                    cursor.execute('CREATE TEMPORARY TABLE countries_staging LIKE countries')
+                    cursor.execute(
+                        "LOAD DATA LOCAL INFILE %s INTO TABLE countries_staging "
+                        "CHARACTER SET utf8mb4 (source, name, capital, population, area, fingerprint)",
+                        (infile_path,),
+                    )
+                    cursor.execute(
+                        'SELECT COUNT(*) FROM countries JOIN countries_staging USING (source, name)'
+                    )
+                    (existing,) = cursor.fetchone()  # type: ignore
+                    cursor.execute("""
+                        INSERT INTO countries (source, name, capital, population, area, fingerprint)
+                        SELECT source, name, capital, population, area, fingerprint FROM countries_staging
+                        ON DUPLICATE KEY UPDATE
+                            capital = VALUES(capital),
+                            population = VALUES(population),
+                            area = VALUES(area),
+                            fingerprint = VALUES(fingerprint)
+                    """)
+                    stats = self._count_changes(len(rows), existing, cursor.rowcount)
+                    self._record_history(cursor, source, '(SELECT name FROM countries_staging)', [], now)
+                    with metrics.timer('db_commit'):
+                        connection.commit()
+                    if stats['inserted'] or stats['updated']:
+                        self._changed()
+                except mysql.connector.Error:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.execute('DROP TEMPORARY TABLE IF EXISTS countries_staging')
+        finally:
+            os.remove(infile_path)
+
+        logger.info("Successfully loaded: %s inserted, %s updated, %s unchanged.",
+                    stats['inserted'], stats['updated'], stats['unchanged'])
+        return stats
+
+    def get_fingerprints(self, source: str = DEFAULT_SOURCE) -> Dict[str, str]:
+        """Retrieve the fingerprint of every stored country of a source.
+
+            Args:
+                source (str, optional): Name of the source.
+
+            Returns:
+                Dict[str, str]: Fingerprints by country name. Rows stored before
+                fingerprinting was introduced map to an empty string.
+        """
+        query = "SELECT name, fingerprint FROM countries WHERE source = %s;"
+
+        with self._connection() as connection, connection.cursor() as cursor:
+            try:
+                cursor.execute(query, (source,))
+                return {name: stored or '' for name, stored in cursor.fetchall()}
             except mysql.connector.Error as e:
                 logger.error('Error executing [%s]: %s', query, e)
+                return {}
 
+    def delete_countries(self, names: Sequence[str], source: str = DEFAULT_SOURCE) -> int:
+        """Delete the countries of a source with the given names.
 
+            Returns:
+                int: The number of deleted rows.
+        """
+        if not names:
+            return 0
+
+        deleted = 0
+        now = datetime.datetime.now()
+        with self._connection() as connection, connection.cursor() as cursor:
+            try:
+                for start in range(0, len(names), self.batch_size):
+                    batch = list(names[start:start + self.batch_size])
+                    placeholders = ', '.join(['%s'] * len(batch))
+                    cursor.execute(
+                        f'DELETE FROM countries WHERE source = %s AND name IN ({placeholders})',
+                        [source, *batch],
+                    )
+                    deleted += cursor.rowcount
+                    self._record_history(cursor, source, f'({placeholders})', batch, now)
+                connection.commit()
+                if deleted:
+                    self._changed()
+                logger.info("Successfully deleted: %s rows.", deleted)
+            except mysql.connector.Error as e:
+                connection.rollback()
+                logger.error('Error deleting countries: %s', e)
+                deleted = 0
+
+        return deleted
+
+    def _fetch_all(self, query: str, params: Sequence = ()) -> List[Tuple]:
+        with self._connection() as connection, connection.cursor() as cursor:
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            except mysql.connector.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+                return []
 
     def select_all_data(self):
         """Select all data from the 'countries' table.
@@ -100,7 +535,7 @@ class DB:
         """
         query = "SELECT * FROM countries;"
 
-        with self.db.cursor() as cursor:
+        with self._connection() as connection, connection.cursor() as cursor:
             try:
                 cursor.execute(query)
                 result = cursor.fetchall()
@@ -110,50 +545,153 @@ class DB:
             except mysql.connector.Error as e:
                 logger.error('Error executing [%s]: %s', query, e)
 
+    def iter_rows(self, batch_size: int = 1000) -> Iterator[Tuple]:
+        """Stream all rows of the 'countries' table, ordered by id.
+
+            Rows are read with an unbuffered cursor and fetched batch_size at a time,
+            so memory stays bounded no matter how large the table is. The connection
+            is held until the generator is exhausted or closed.
+
+            Args:
+                batch_size (int, optional): Number of rows fetched per round-trip. Defaults to 1000.
+
+            Yields:
+                Tuple: One row of the table.
+        """
+        query = "SELECT * FROM countries ORDER BY id;"
+
+        with self._connection() as connection:
+            cursor = connection.cursor(buffered=False)
+            try:
+                cursor.execute(query)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            except mysql.connector.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+            finally:
+                # a stopped generator leaves rows on the wire, which must be read
+                # before the connection can be reused
+                if connection.unread_result:
+                    connection.consume_results()
+                cursor.close()
+
+    def select_page(self, after_id: int = 0, limit: int = 1000) -> List[Tuple]:
+        """Select the next page of rows using keyset pagination on 'id'.
+
+            Unlike LIMIT/OFFSET, the cost of a page does not grow with its position.
+
+            Args:
+                after_id (int, optional): Only rows with a greater id are returned. Defaults to 0.
+                limit (int, optional): Maximum number of rows to return. Defaults to 1000.
+
+            Returns:
+                List[Tuple]: The rows of the page, ordered by id.
+        """
+        query = "SELECT * FROM countries WHERE id > %s ORDER BY id LIMIT %s;"
+
+        with self._connection() as connection, connection.cursor() as cursor:
+            try:
+                cursor.execute(query, (after_id, limit))
+                return cursor.fetchall()
+            except mysql.connector.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+                return []
+
+    def select_window(self, order_by: str = 'id', descending: bool = False,
+                      filter_column: Optional[str] = None, filter_text: str = '',
+                      after: Optional[Tuple] = None, limit: int = 500) -> List[Tuple]:
+        """Select a filtered, sorted window of rows, for display in the table view.
+
+            Filtering and sorting run in MySQL on indexed columns, and the window is
+            paginated by keyset (the sort value and id of the last row seen), so each
+            call only reads the rows it returns.
 
-    def get_column_names(self) -> List[str]:
-        """Retrieve the column names of the 'countries' table.
+            Args:
+                order_by (str, optional): Column to sort on. Defaults to "id".
+                descending (bool, optional): Sort in descending order. Defaults to False.
+                filter_column (str, optional): Column to filter on. Defaults to no filter.
+                filter_text (str, optional): Text from the filter box, see _filter_condition().
+                after (Tuple, optional): (order_by value, id) of the last row of the previous window.
+                limit (int, optional): Maximum number of rows to return. Defaults to 500.
+
+            Returns:
+                List[Tuple]: The rows of the window.
+        """
+        query, params = self._build_window_query(order_by, descending, filter_column, filter_text, after, limit)
+
+        with self._connection() as connection, connection.cursor() as cursor:
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            except mysql.connector.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+                return []
+
+    def _read_column_names(self) -> List[str]:
+        """Reads the column names of the 'countries' table.
+
+            LIMIT 0 makes the server send the result metadata only, so the names are
+            also known while the table is empty.
 
             Returns:
                 List[str]: A list of column names.
         """
-        query = "SELECT * FROM countries LIMIT 1;"
+        query = "SELECT * FROM countries LIMIT 0;"
         column_names = []
 
-        with self.db.cursor() as cursor:
+        with self._connection() as connection, connection.cursor() as cursor:
             try:
                 cursor.execute(query)
-                row = cursor.fetchone()
+                cursor.fetchall()
 
-                if row and cursor.description:
+                if cursor.description:
                     # Use cursor.description to get column names
                     column_names = [desc[0] for desc in cursor.description]
                     logger.info('Column names: %s', column_names)
                 else:
-                    logger.warning('No rows returned by query')
+                    logger.warning('No columns returned by query')
             except mysql.connector.Error as e:
                 logger.error('Error executing [%s]: %s', query, e)
 
         return column_names
 
-    def get_last_updated_date(self) -> Optional[str]:
-        """Retrieve the last updated date from the 'countries' table.
+    def count_countries(self) -> int:
+        """Count the rows of the 'countries' table.
 
             Returns:
-                Optional[str]: The last updated date as a string, or None if no data is available.
+                int: The number of rows, or 0 if the table cannot be read.
+        """
+        query = 'SELECT COUNT(*) FROM countries;'
+
+        with self._connection() as connection, connection.cursor() as cursor:
+            try:
+                cursor.execute(query)
+                (count,) = cursor.fetchone()  # type: ignore
+                return count
+            except mysql.connector.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+                return 0
+
+    def _read_last_updated_date(self) -> Optional[datetime.datetime]:
+        """Reads the last updated date from the 'countries' table.
+
+            Returns:
+                Optional[datetime.datetime]: The last updated date, or None if the table is
+                empty or cannot be read, like the other storage backends.
         """
         query = 'SELECT MAX(updated_at) AS max_date FROM countries;'
 
-        with self.db.cursor(dictionary=True) as cursor:
+        with self._connection() as connection, connection.cursor(dictionary=True) as cursor:
             try:
                 cursor.execute(query)
                 result = cursor.fetchone()
-                if result and 'max_date' in result:
-                    return result['max_date']   # type: ignore
-                else:
-                    raise ValueError('No data in table')
+                return result['max_date'] if result else None   # type: ignore
             except mysql.connector.Error as e:
                 logger.error('Error executing [%s]: %s', query, e)
+                return None
 
 
 if __name__ == "__main__":
@@ -161,18 +699,8 @@ if __name__ == "__main__":
     # db.create_countries_table()
 
     data: List[CountryData] = [
-        {
-            "name": "country_name1",
-            "capital": "country_capital1",
-            "population": "country_population1",
-            "area": 23,
-        },
-        {
-            "name": "country_name2",
-            "capital": "country_capital2",
-            "population": "country_population2",
-            "area": 45,
-        },
+        CountryData(name="country_name1", capital="country_capital1", population=1000, area=23.0),
+        CountryData(name="country_name2", capital="country_capital2", population=2000, area=45.0),
     ]
 
     db.insert_countries_data(data)
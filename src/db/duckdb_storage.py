@@ -0,0 +1,355 @@
+""" module duckdb_storage
+
+    Storage backend keeping the 'countries' table in an embedded DuckDB database file.
+
+    DuckDB stores the table column by column, so aggregates over many rows (sums,
+    averages, group by source) read only the columns they need; query() runs such
+    analytical SQL directly, and export_parquet() writes the table to a Parquet
+    file for other tools. Row lookups are slower than with MySQL or SQLite, so the
+    table view is best served by one of those.
+
+    'countries_history' has no index: versions are appended in time order, so the
+    min/max statistics DuckDB keeps per row group of valid_from let as-of reads skip
+    the row groups written after the requested time, much like a partition by date.
+
+    Requires the duckdb package.
+"""
+
+import csv
+import datetime
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import duckdb
+
+from src.db.change_detection import fingerprint
+from src.db.storage import Storage, metadata_cache
+from src.shared_types import DEFAULT_SOURCE, CountryData, UpsertStats
+from src.utils.config_loader import load_config
+from src.utils.metrics import metrics
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('duckdb_storage', logging.INFO)
+
+
+class DuckDBStorage(Storage):
+    """Stores the 'countries' table in a DuckDB database file."""
+
+    PLACEHOLDER = '?'
+    LIKE_OPERATOR = 'ILIKE'
+
+    UPSERT_QUERY = """
+        INSERT INTO countries (source, name, capital, population, area, fingerprint)
+        SELECT source, name, capital, population, area, fingerprint FROM countries_staging
+        ON CONFLICT (source, name) DO UPDATE SET
+            capital = excluded.capital,
+            population = excluded.population,
+            area = excluded.area,
+            fingerprint = excluded.fingerprint,
+            updated_at = current_localtimestamp()
+        WHERE countries.fingerprint IS DISTINCT FROM excluded.fingerprint
+    """
+
+    # marks NULL values in the CSV file of a bulk load
+    NULL_MARKER = '\\N'
+
+    def __init__(self, path: str, batch_size: int = 1000, parquet_file: str = '',
+                 metadata_ttl: float = 0) -> None:
+        """ Opens (or creates) the database file.
+
+            Args:
+                path (str): Path of the database file, ':memory:' for an in-memory database.
+                batch_size (int, optional): Names per DELETE statement.
+                parquet_file (str, optional): Default target of export_parquet().
+                metadata_ttl (float, optional): Seconds the cached column names and last update
+                    time are trusted, 0 until this process changes the table.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.parquet_file = parquet_file
+        database = f'duckdb:{os.path.abspath(path)}' if path != ':memory:' else f'duckdb:memory:{id(self)}'
+        self.metadata = metadata_cache(database, metadata_ttl)
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        try:
+            self._database = duckdb.connect(path)
+            logger.info("Opened DuckDB database '%s'", path)
+        except duckdb.Error as e:
+            error_msg = f"Failed to open DuckDB database '{path}': {e}"
+            logger.error(error_msg)
+            raise ConnectionError(error_msg) from e
+
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config_file: str, section: str = 'storage') -> 'DuckDBStorage':
+        """Creates a DuckDBStorage from the 'duckdb_file' and 'parquet_file' keys of the given section."""
+        storage_config = load_config(config_file, section)
+        db_options = load_config(config_file, 'db')
+        return cls(
+            storage_config.get('duckdb_file', 'data/countries.duckdb'),
+            batch_size=int(db_options.get('batch_size', 1000)),
+            parquet_file=storage_config.get('parquet_file', ''),
+            metadata_ttl=float(db_options.get('metadata_ttl', 0)),
+        )
+
+    @contextmanager
+    def _connection(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """The connection of the calling thread; DuckDB connections must not be shared between threads."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._database.cursor()
+        yield connection
+
+    def close(self) -> None:
+        """Closes the database, and with it the connections of all threads."""
+        self._database.close()
+
+    def create_countries_table(self) -> None:
+        """Creates a 'countries' table in the database if it doesn't already exist.
+
+            Only the (source, name) key is indexed: DuckDB scans columns quickly, and
+            every index slows down the bulk loads.
+        """
+        query = f"""
+            CREATE SEQUENCE IF NOT EXISTS countries_id_seq;
+            CREATE TABLE IF NOT EXISTS countries (
+                id BIGINT PRIMARY KEY DEFAULT nextval('countries_id_seq'),
+                source VARCHAR NOT NULL DEFAULT '{DEFAULT_SOURCE}',
+                name VARCHAR,
+                capital VARCHAR,
+                population BIGINT,
+                area DOUBLE,
+                fingerprint VARCHAR,
+                created_at TIMESTAMP NOT NULL DEFAULT current_localtimestamp(),
+                updated_at TIMESTAMP NOT NULL DEFAULT current_localtimestamp(),
+                UNIQUE (source, name)
+            );
+            CREATE SEQUENCE IF NOT EXISTS countries_history_id_seq;
+            CREATE TABLE IF NOT EXISTS countries_history (
+                id BIGINT DEFAULT nextval('countries_history_id_seq'),
+                source VARCHAR NOT NULL,
+                name VARCHAR NOT NULL,
+                capital VARCHAR,
+                population BIGINT,
+                area DOUBLE,
+                fingerprint VARCHAR,
+                valid_from TIMESTAMP NOT NULL,
+                valid_to TIMESTAMP NOT NULL
+            );
+        """
+
+        with self._connection() as connection:
+            try:
+                connection.execute(query)
+                seed_query, seed_params = self._seed_history_query()
+                (seeded,) = connection.execute(seed_query, seed_params).fetchone()
+                if seeded:
+                    logger.info('Added %s countries to the history', seeded)
+            except duckdb.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+        self._changed(schema=True)
+
+    @metrics.timed('insert')
+    def insert_countries_data(self, countries_data: List[CountryData], source: str = DEFAULT_SOURCE) -> UpsertStats:
+        """Inserts or updates a list of country data in the 'countries' table, in one transaction.
+
+            Rows are matched on the source and the country name. Existing rows are only
+            touched (and their updated_at moved) when one of their values actually changed,
+            and each change is recorded in 'countries_history'.
+
+            The rows are written to a CSV file and loaded with COPY into a staging table,
+            which is merged into the table by a single upsert: DuckDB binds thousands
+            of statement parameters far slower than it reads a file.
+
+            Args:
+                countries_data (List[CountryData]): The rows to store.
+                source (str, optional): Name of the source the data was scraped from.
+
+            Returns:
+                UpsertStats: The number of inserted, updated and unchanged rows.
+        """
+        # one row per name: a single upsert cannot update the same row twice
+        rows = list({country[0]: (source, *country, fingerprint(country)) for country in countries_data}.values())
+        stats: UpsertStats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        if not rows:
+            return stats
+        now = datetime.datetime.now()
+
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.csv', newline='', delete=False) as f:
+            csv.writer(f, lineterminator='\n').writerows(
+                [self.NULL_MARKER if value is None else value for value in row] for row in rows
+            )
+            csv_path = f.name
+
+        with self._connection() as connection:
+            try:
+                connection.begin()
+                connection.execute("""
+                    CREATE OR REPLACE TEMPORARY TABLE countries_staging (
+                        source VARCHAR, name VARCHAR, capital VARCHAR,
+                        population BIGINT, area DOUBLE, fingerprint VARCHAR
+                    )
+                """)
+                escaped_path = csv_path.replace("'", "''")
+                connection.execute(
+                    f"COPY countries_staging FROM '{escaped_path}' (FORMAT CSV, HEADER false, DELIM ',', "
+                    f"QUOTE '\"', ESCAPE '\"', NULLSTR '{self.NULL_MARKER}', AUTO_DETECT false)"
+                )
+                (existing,) = connection.execute(
+                    'SELECT COUNT(*) FROM countries JOIN countries_staging USING (source, name)'
+                ).fetchone()
+                # inserted and updated rows; rows skipped by the WHERE of the upsert are not counted
+                (changed,) = connection.execute(self.UPSERT_QUERY).fetchone()
+                for query, params in self._history_queries(source, '(SELECT name FROM countries_staging)', [], now):
+                    connection.execute(query, params)
+                connection.execute('DROP TABLE countries_staging')
+
+                inserted = len(rows) - existing
+                stats = {'inserted': inserted, 'updated': changed - inserted, 'unchanged': existing - (changed - inserted)}
+                with metrics.timer('db_commit'):
+                    connection.commit()
+                if changed:
+                    self._changed()
+                logger.info("Successfully upserted: %s inserted, %s updated, %s unchanged.",
+                            stats['inserted'], stats['updated'], stats['unchanged'])
+            except duckdb.Error as e:
+                connection.rollback()
+                logger.error('Error executing [%s]: %s', self.UPSERT_QUERY, e)
+            finally:
+                os.remove(csv_path)
+
+        return stats
+
+    def get_fingerprints(self, source: str = DEFAULT_SOURCE) -> Dict[str, str]:
+        """Retrieve the fingerprint of every stored country of a source, by country name."""
+        return {name: stored or '' for name, stored in self.query(
+            'SELECT name, fingerprint FROM countries WHERE source = ?;', (source,)
+        )}
+
+    def delete_countries(self, names: Sequence[str], source: str = DEFAULT_SOURCE) -> int:
+        """Delete the countries of a source with the given names.
+
+            Returns:
+                int: The number of deleted rows.
+        """
+        if not names:
+            return 0
+
+        deleted = 0
+        now = datetime.datetime.now()
+        with self._connection() as connection:
+            try:
+                connection.begin()
+                for start in range(0, len(names), self.batch_size):
+                    batch = list(names[start:start + self.batch_size])
+                    placeholders = ', '.join(['?'] * len(batch))
+                    (count,) = connection.execute(
+                        f'DELETE FROM countries WHERE source = ? AND name IN ({placeholders})',
+                        [source, *batch],
+                    ).fetchone()
+                    deleted += count
+                    for query, params in self._history_queries(source, f'({placeholders})', batch, now):
+                        connection.execute(query, params)
+                connection.commit()
+                if deleted:
+                    self._changed()
+                logger.info("Successfully deleted: %s rows.", deleted)
+            except duckdb.Error as e:
+                connection.rollback()
+                logger.error('Error deleting countries: %s', e)
+                deleted = 0
+
+        return deleted
+
+    def _fetch_all(self, query: str, params: Sequence = ()) -> List[Tuple]:
+        return self.query(query, params)
+
+    def query(self, query: str, params: Sequence = ()) -> List[Tuple]:
+        """ Runs an SQL query, e.g. an aggregate over the countries, and returns its rows.
+
+            Returns:
+                List[Tuple]: The rows of the result, empty if the query failed.
+        """
+        with self._connection() as connection:
+            try:
+                return connection.execute(query, params).fetchall()
+            except duckdb.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+                return []
+
+    def export_parquet(self, path: Optional[str] = None) -> str:
+        """ Writes the 'countries' table to a Parquet file, ordered by id.
+
+            Args:
+                path (str, optional): Target file. Defaults to the configured parquet_file.
+
+            Returns:
+                str: The path written.
+
+            Raises:
+                ValueError: If no path is given or configured.
+                duckdb.Error: If the file cannot be written.
+        """
+        path = path or self.parquet_file
+        if not path:
+            raise ValueError('No Parquet file given or configured')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        with self._connection() as connection:
+            # the path is a literal of the COPY statement, it cannot be a parameter
+            escaped_path = path.replace("'", "''")
+            connection.execute(
+                f"COPY (SELECT * FROM countries ORDER BY id) TO '{escaped_path}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+            )
+        logger.info('Exported the countries table to %s', path)
+        return path
+
+    def iter_rows(self, batch_size: int = 1000) -> Iterator[Tuple]:
+        """Stream all rows of the 'countries' table, ordered by id, batch_size rows at a time."""
+        query = 'SELECT * FROM countries ORDER BY id;'
+
+        with self._connection() as connection:
+            try:
+                connection.execute(query)
+                while True:
+                    rows = connection.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            except duckdb.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+
+    def select_page(self, after_id: int = 0, limit: int = 1000) -> List[Tuple]:
+        """Select the next page of rows using keyset pagination on 'id'."""
+        return self.query('SELECT * FROM countries WHERE id > ? ORDER BY id LIMIT ?;', (after_id, limit))
+
+    def select_window(self, order_by: str = 'id', descending: bool = False,
+                      filter_column: Optional[str] = None, filter_text: str = '',
+                      after: Optional[Tuple] = None, limit: int = 500) -> List[Tuple]:
+        """Select a filtered, sorted window of rows, for display in the table view. See DB.select_window()."""
+        query, params = self._build_window_query(order_by, descending, filter_column, filter_text, after, limit)
+        return self.query(query, params)
+
+    def _read_column_names(self) -> List[str]:
+        """Reads the column names of the 'countries' table from its schema."""
+        return [row[0] for row in self.query(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 'countries' "
+            "ORDER BY ordinal_position;"
+        )]
+
+    def count_countries(self) -> int:
+        """Count the rows of the 'countries' table, 0 if it cannot be read."""
+        rows = self.query('SELECT COUNT(*) FROM countries;')
+        return rows[0][0] if rows else 0
+
+    def _read_last_updated_date(self):
+        """Reads the last updated date of the 'countries' table, None if it is empty."""
+        rows = self.query('SELECT MAX(updated_at) FROM countries;')
+        return rows[0][0] if rows else None
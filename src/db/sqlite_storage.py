@@ -0,0 +1,319 @@
+""" module sqlite_storage
+
+    Storage backend keeping the 'countries' table in an embedded SQLite database file,
+    for single-node deployments and tests without a MySQL server.
+
+    The database runs in WAL mode, so the table view can read while a crawl writes,
+    and every bulk load is one transaction. Each thread gets its own connection.
+
+    SQLite has no table partitioning; the as-of reads of 'countries_history' are
+    answered from a covering index on (source, valid_to, valid_from, values) instead.
+    Times are stored as ISO 8601 text, which sorts chronologically.
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.db.change_detection import fingerprint
+from src.db.storage import Storage, metadata_cache
+from src.shared_types import DEFAULT_SOURCE, CountryData, UpsertStats
+from src.utils.config_loader import load_config
+from src.utils.metrics import metrics
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('sqlite_storage', logging.INFO)
+
+
+class SQLiteStorage(Storage):
+    """Stores the 'countries' table in a SQLite database file."""
+
+    PLACEHOLDER = '?'
+
+    UPSERT_QUERY = """
+        INSERT INTO countries (source, name, capital, population, area, fingerprint)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (source, name) DO UPDATE SET
+            capital = excluded.capital,
+            population = excluded.population,
+            area = excluded.area,
+            fingerprint = excluded.fingerprint,
+            updated_at = datetime('now', 'localtime')
+        WHERE countries.fingerprint IS NOT excluded.fingerprint
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, busy_timeout: float = 10.0,
+                 metadata_ttl: float = 0) -> None:
+        """ Opens (or creates) the database file.
+
+            Args:
+                path (str): Path of the database file, ':memory:' for a private in-memory database.
+                batch_size (int, optional): Rows per executemany() call of a bulk load.
+                busy_timeout (float, optional): Seconds to wait for a lock held by another connection.
+                metadata_ttl (float, optional): Seconds the cached column names and last update
+                    time are trusted, 0 until this process changes the table.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.busy_timeout = busy_timeout
+        # every ':memory:' connection is a database of its own
+        database = f'sqlite:{os.path.abspath(path)}' if path != ':memory:' else f'sqlite:memory:{id(self)}'
+        self.metadata = metadata_cache(database, metadata_ttl)
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        try:
+            with self._connection() as connection:
+                journal_mode = connection.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+            logger.info("Opened SQLite database '%s' (journal mode %s)", path, journal_mode)
+        except sqlite3.Error as e:
+            error_msg = f"Failed to open SQLite database '{path}': {e}"
+            logger.error(error_msg)
+            raise ConnectionError(error_msg) from e
+
+    @classmethod
+    def from_config(cls, config_file: str, section: str = 'storage') -> 'SQLiteStorage':
+        """Creates a SQLiteStorage from the 'sqlite_file' key of the given section and the [db] section."""
+        storage_config = load_config(config_file, section)
+        db_options = load_config(config_file, 'db')
+        return cls(
+            storage_config.get('sqlite_file', 'data/countries.sqlite3'),
+            batch_size=int(db_options.get('batch_size', 1000)),
+            busy_timeout=float(db_options.get('pool_timeout', 10)),
+            metadata_ttl=float(db_options.get('metadata_ttl', 0)),
+        )
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """The connection of the calling thread, opened on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # autocommit mode: transactions are started explicitly with BEGIN
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
+            )
+            connection.execute('PRAGMA synchronous = NORMAL')
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        yield connection
+
+    def close(self) -> None:
+        """Closes the connections of all threads."""
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def create_countries_table(self) -> None:
+        """Creates a 'countries' table in the database if it doesn't already exist."""
+        query = f"""
+            CREATE TABLE IF NOT EXISTS countries (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL DEFAULT '{DEFAULT_SOURCE}',
+                name TEXT,
+                capital TEXT,
+                population INTEGER,
+                area REAL,
+                fingerprint TEXT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                updated_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                UNIQUE (source, name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_countries_name ON countries (name);
+            CREATE INDEX IF NOT EXISTS idx_countries_capital ON countries (capital);
+            CREATE INDEX IF NOT EXISTS idx_countries_population ON countries (population);
+            CREATE INDEX IF NOT EXISTS idx_countries_area ON countries (area);
+            CREATE INDEX IF NOT EXISTS idx_countries_updated_at ON countries (updated_at);
+
+            CREATE TABLE IF NOT EXISTS countries_history (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                name TEXT NOT NULL,
+                capital TEXT,
+                population INTEGER,
+                area REAL,
+                fingerprint TEXT,
+                valid_from TEXT NOT NULL,
+                valid_to TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_countries_history_name ON countries_history (source, name, valid_to);
+            CREATE INDEX IF NOT EXISTS idx_countries_history_as_of
+                ON countries_history (source, valid_to, valid_from, name, capital, population, area, fingerprint);
+        """
+
+        with self._connection() as connection:
+            try:
+                connection.executescript(query)
+                seed_query, seed_params = self._seed_history_query()
+                seeded = connection.execute(seed_query, seed_params).rowcount
+                if seeded:
+                    logger.info('Added %s countries to the history', seeded)
+            except sqlite3.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+        self._changed(schema=True)
+
+    def _timestamp(self, value: datetime.datetime) -> str:
+        return value.isoformat(sep=' ', timespec='microseconds')
+
+    def _from_timestamp(self, value: str) -> datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+
+    @metrics.timed('insert')
+    def insert_countries_data(self, countries_data: List[CountryData], source: str = DEFAULT_SOURCE) -> UpsertStats:
+        """Inserts or updates a list of country data in the 'countries' table, in one transaction.
+
+            Rows are matched on the source and the country name. Existing rows are only
+            touched (and their updated_at moved) when one of their values actually changed,
+            and each change is recorded in 'countries_history'.
+
+            Args:
+                countries_data (List[CountryData]): The rows to store.
+                source (str, optional): Name of the source the data was scraped from.
+
+            Returns:
+                UpsertStats: The number of inserted, updated and unchanged rows.
+        """
+        rows = [(source, *country, fingerprint(country)) for country in countries_data]
+        stats: UpsertStats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        now = datetime.datetime.now()
+
+        with self._connection() as connection:
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                for start in range(0, len(rows), self.batch_size):
+                    batch = rows[start:start + self.batch_size]
+                    placeholders = ', '.join(['?'] * len(batch))
+                    names = [row[1] for row in batch]
+                    (existing,) = connection.execute(
+                        f'SELECT COUNT(*) FROM countries WHERE source = ? AND name IN ({placeholders})',
+                        [source, *names],
+                    ).fetchone()
+                    # rows skipped by the WHERE of the upsert are not counted as changed
+                    changed = connection.executemany(self.UPSERT_QUERY, batch).rowcount
+                    for query, params in self._history_queries(source, f'({placeholders})', names, now):
+                        connection.execute(query, params)
+                    inserted = len(batch) - existing
+                    stats['inserted'] += inserted
+                    stats['updated'] += changed - inserted
+                    stats['unchanged'] += existing - (changed - inserted)
+                with metrics.timer('db_commit'):
+                    connection.execute('COMMIT')
+                if stats['inserted'] or stats['updated']:
+                    self._changed()
+                logger.info("Successfully upserted: %s inserted, %s updated, %s unchanged.",
+                            stats['inserted'], stats['updated'], stats['unchanged'])
+            except sqlite3.Error as e:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                logger.error('Error executing [%s]: %s', self.UPSERT_QUERY, e)
+                stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        return stats
+
+    def get_fingerprints(self, source: str = DEFAULT_SOURCE) -> Dict[str, str]:
+        """Retrieve the fingerprint of every stored country of a source, by country name."""
+        query = 'SELECT name, fingerprint FROM countries WHERE source = ?;'
+
+        with self._connection() as connection:
+            try:
+                return {name: stored or '' for name, stored in connection.execute(query, (source,))}
+            except sqlite3.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+                return {}
+
+    def delete_countries(self, names: Sequence[str], source: str = DEFAULT_SOURCE) -> int:
+        """Delete the countries of a source with the given names.
+
+            Returns:
+                int: The number of deleted rows.
+        """
+        if not names:
+            return 0
+
+        deleted = 0
+        now = datetime.datetime.now()
+        with self._connection() as connection:
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                for start in range(0, len(names), self.batch_size):
+                    batch = list(names[start:start + self.batch_size])
+                    placeholders = ', '.join(['?'] * len(batch))
+                    deleted += connection.execute(
+                        f'DELETE FROM countries WHERE source = ? AND name IN ({placeholders})',
+                        [source, *batch],
+                    ).rowcount
+                    for query, params in self._history_queries(source, f'({placeholders})', batch, now):
+                        connection.execute(query, params)
+                connection.execute('COMMIT')
+                if deleted:
+                    self._changed()
+                logger.info("Successfully deleted: %s rows.", deleted)
+            except sqlite3.Error as e:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                logger.error('Error deleting countries: %s', e)
+                deleted = 0
+
+        return deleted
+
+    def _fetch_all(self, query: str, params: Sequence = ()) -> List[Tuple]:
+        with self._connection() as connection:
+            try:
+                return connection.execute(query, params).fetchall()
+            except sqlite3.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+                return []
+
+    def iter_rows(self, batch_size: int = 1000) -> Iterator[Tuple]:
+        """Stream all rows of the 'countries' table, ordered by id, batch_size rows at a time."""
+        query = 'SELECT * FROM countries ORDER BY id;'
+
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(query)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            except sqlite3.Error as e:
+                logger.error('Error executing [%s]: %s', query, e)
+            finally:
+                cursor.close()
+
+    def select_page(self, after_id: int = 0, limit: int = 1000) -> List[Tuple]:
+        """Select the next page of rows using keyset pagination on 'id'."""
+        return self._fetch_all('SELECT * FROM countries WHERE id > ? ORDER BY id LIMIT ?;', (after_id, limit))
+
+    def select_window(self, order_by: str = 'id', descending: bool = False,
+                      filter_column: Optional[str] = None, filter_text: str = '',
+                      after: Optional[Tuple] = None, limit: int = 500) -> List[Tuple]:
+        """Select a filtered, sorted window of rows, for display in the table view. See DB.select_window()."""
+        query, params = self._build_window_query(order_by, descending, filter_column, filter_text, after, limit)
+        return self._fetch_all(query, params)
+
+    def _read_column_names(self) -> List[str]:
+        """Reads the column names of the 'countries' table from its schema."""
+        return [row[1] for row in self._fetch_all('PRAGMA table_info(countries);')]
+
+    def count_countries(self) -> int:
+        """Count the rows of the 'countries' table, 0 if it cannot be read."""
+        rows = self._fetch_all('SELECT COUNT(*) FROM countries;')
+        return rows[0][0] if rows else 0
+
+    def _read_last_updated_date(self) -> Optional[datetime.datetime]:
+        """Reads the last updated date of the 'countries' table, None if it is empty."""
+        rows = self._fetch_all('SELECT MAX(updated_at) FROM countries;')
+        return datetime.datetime.fromisoformat(rows[0][0]) if rows and rows[0][0] else None
@@ -0,0 +1,485 @@
+""" module storage
+
+    The interface of the storage backends of the 'countries' table, and the factory
+    which picks one from the [storage] section of src/config.ini:
+
+        [storage]
+        backend = mysql | sqlite | duckdb
+
+        mysql   DB (db.py), a MySQL server configured in the [mysql] section
+        sqlite  SQLiteStorage, an embedded database file, no server needed
+        duckdb  DuckDBStorage, an embedded columnar database file for analytical
+                queries, which can also export the table to Parquet
+
+    The backend modules (and their drivers) are only imported when selected.
+
+    Every backend also keeps the 'countries_history' table: each version of a country
+    with the time range [valid_from, valid_to) in which it was stored. A version is
+    written in the same transaction as the change of the country, and closed (its
+    valid_to set) when the country changes again or is deleted; the current version
+    ends at OPEN_END. This makes select_as_of() and diff_between() simple range reads.
+
+    The column names and the last update time of the table are cached per database
+    in a MetadataCache shared by all Storage instances of the process, and invalidated
+    when one of them commits a change; opening the table view again costs no query.
+
+    Example:
+        >>> storage = create_storage('src/config.ini')
+        >>> storage.create_countries_table()
+        >>> storage.insert_countries_data(countries_data)
+"""
+
+import datetime
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.db.change_detection import diff_countries
+from src.shared_types import DEFAULT_SOURCE, CountriesDiff, CountryData, CountryVersion, UpsertStats
+from src.utils.config_loader import ConfigError, load_config
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('storage', logging.INFO)
+
+BACKENDS = ('mysql', 'sqlite', 'duckdb')
+
+# valid_to of the current version of a country in 'countries_history'; a far future
+# date rather than NULL, so that "valid_to > t" is a plain index range
+OPEN_END = datetime.datetime(9999, 12, 31)
+
+HISTORY_COLUMNS = 'source, name, capital, population, area, fingerprint, valid_from, valid_to'
+
+
+class MetadataCache:
+    """Metadata of one database (column names, last update time), shared within the process.
+
+        Values are loaded on first use and kept until a Storage of the same database
+        invalidates them after a commit, or until ttl seconds passed (0: no expiry),
+        which bounds how long changes made by other processes go unnoticed.
+    """
+
+    def __init__(self, ttl: float = 0) -> None:
+        self.ttl = ttl
+        # key -> (load time, value)
+        self._values: Dict[str, Tuple[float, Any]] = {}
+        # incremented by every invalidation, so that a load which raced with one is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, load: Callable[[], Any]) -> Any:
+        """ Returns the cached value of key, calling load() on a miss.
+
+            Empty values (e.g. after a failed query) are returned but not cached.
+        """
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and (not self.ttl or time.monotonic() - entry[0] < self.ttl):
+                return entry[1]
+            generation = self._generation
+
+        value = load()
+
+        if value:
+            with self._lock:
+                if generation == self._generation:
+                    self._values[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate(self, *keys: str) -> None:
+        """Drops the given keys, or all values if no key is given."""
+        with self._lock:
+            self._generation += 1
+            if keys:
+                for key in keys:
+                    self._values.pop(key, None)
+            else:
+                self._values.clear()
+
+
+_metadata_caches: Dict[str, MetadataCache] = {}
+_metadata_caches_lock = threading.Lock()
+
+
+def metadata_cache(database: str, ttl: float = 0) -> MetadataCache:
+    """Returns the MetadataCache of a database, identified by e.g. its file path, creating it on first use."""
+    with _metadata_caches_lock:
+        if database not in _metadata_caches:
+            _metadata_caches[database] = MetadataCache(ttl)
+        return _metadata_caches[database]
+
+
+class Storage(ABC):
+    """Base class of the storage backends.
+
+        Subclasses implement the abstract methods and set
+        self.metadata to the MetadataCache of their database. The query builder of
+        the table view is shared; it writes PLACEHOLDER for every parameter.
+    """
+
+    metadata: MetadataCache
+
+    # parameter marker of the database driver
+    PLACEHOLDER = '%s'
+    # whether ORDER BY takes NULLS FIRST/LAST; without it, NULLs must already sort as the smallest values
+    NULLS_ORDER = True
+    # case-insensitive pattern match, like LIKE with the default collations of MySQL and SQLite
+    LIKE_OPERATOR = 'LIKE'
+
+    # columns the table view may filter and sort on, by kind of filter
+    TEXT_COLUMNS = ('source', 'name', 'capital', 'fingerprint')
+    NUMERIC_COLUMNS = ('id', 'population', 'area')
+    TIME_COLUMNS = ('created_at', 'updated_at')
+
+    @classmethod
+    def can_query(cls, column: str) -> bool:
+        """Whether select_window() can sort and filter on column."""
+        return column in cls.TEXT_COLUMNS + cls.NUMERIC_COLUMNS + cls.TIME_COLUMNS
+
+    @abstractmethod
+    def create_countries_table(self) -> None:
+        """Creates the 'countries' table if it doesn't already exist."""
+        raise NotImplementedError
+
+    def migrate_countries_table(self) -> None:
+        """Brings a 'countries' table created by an older version up to date."""
+
+    @abstractmethod
+    def insert_countries_data(self, countries_data: List[CountryData], source: str = DEFAULT_SOURCE) -> UpsertStats:
+        """Inserts or updates countries, matched on the source and the country name."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_fingerprints(self, source: str = DEFAULT_SOURCE) -> Dict[str, str]:
+        """Retrieve the fingerprint of every stored country of a source, by country name."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_countries(self, names: Sequence[str], source: str = DEFAULT_SOURCE) -> int:
+        """Delete the countries of a source with the given names and return the number of deleted rows."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_rows(self, batch_size: int = 1000) -> Iterator[Tuple]:
+        """Stream all rows of the 'countries' table, ordered by id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_page(self, after_id: int = 0, limit: int = 1000) -> List[Tuple]:
+        """Select the next page of rows using keyset pagination on 'id'."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def select_window(self, order_by: str = 'id', descending: bool = False,
+                      filter_column: Optional[str] = None, filter_text: str = '',
+                      after: Optional[Tuple] = None, limit: int = 500) -> List[Tuple]:
+        """Select a filtered, sorted window of rows, for display in the table view."""
+        raise NotImplementedError
+
+    def get_column_names(self) -> List[str]:
+        """Retrieve the column names of the 'countries' table, from the metadata cache if possible."""
+        # a copy: the cached list is shared by all storages of the database
+        return list(self.metadata.get('column_names', self._read_column_names))
+
+    def get_last_updated_date(self):
+        """Retrieve the time of the last change of the 'countries' table, as a datetime,
+            from the metadata cache if possible; None if the table is empty.
+        """
+        return self.metadata.get('last_updated', self._read_last_updated_date)
+
+    @abstractmethod
+    def _read_column_names(self) -> List[str]:
+        """Reads the column names of the 'countries' table from the schema, without reading rows."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _read_last_updated_date(self):
+        """Reads the largest updated_at of the 'countries' table."""
+        raise NotImplementedError
+
+    def _changed(self, schema: bool = False) -> None:
+        """Invalidates the cached metadata after a committed change of the table (or of its schema)."""
+        if schema:
+            self.metadata.invalidate()
+        else:
+            self.metadata.invalidate('last_updated')
+
+    @abstractmethod
+    def count_countries(self) -> int:
+        """Count the rows of the 'countries' table."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Releases the connections of the backend."""
+
+    @abstractmethod
+    def _fetch_all(self, query: str, params: Sequence = ()) -> List[Tuple]:
+        """Runs a read query and returns its rows, empty if it failed."""
+        raise NotImplementedError
+
+    def _timestamp(self, value: datetime.datetime):
+        """Converts a time into a parameter of the database driver."""
+        return value
+
+    def _from_timestamp(self, value) -> datetime.datetime:
+        """Converts a time read from the database into a datetime."""
+        return value
+
+    def _seed_history_query(self) -> Tuple[str, list]:
+        """ The statement adding a current version for every country which has none,
+            e.g. for the rows stored before the history table was introduced.
+        """
+        mark = self.PLACEHOLDER
+        query = f"""
+            INSERT INTO countries_history ({HISTORY_COLUMNS})
+            SELECT c.source, c.name, c.capital, c.population, c.area, c.fingerprint, c.updated_at, {mark}
+            FROM countries c
+            WHERE NOT EXISTS (
+                SELECT 1 FROM countries_history h
+                WHERE h.source = c.source AND h.name = c.name AND h.valid_to = {mark}
+            )
+        """
+        open_end = self._timestamp(OPEN_END)
+        return query, [open_end, open_end]
+
+    def _history_queries(self, source: str, names_sql: str, names_params: Sequence,
+                         now: datetime.datetime) -> List[Tuple[str, list]]:
+        """ The statements bringing the history of some countries up to date with the 'countries' table.
+
+            The current version of each of the countries is closed if the country was
+            deleted or its fingerprint changed, and a new version is opened for each
+            country without a current one. Run them in the transaction of the change.
+
+            Args:
+                source (str): Source of the countries.
+                names_sql (str): An SQL list or subquery of the country names, e.g. "(?, ?)".
+                names_params (Sequence): The parameters of names_sql.
+                now (datetime.datetime): Time of the change.
+
+            Returns:
+                List[Tuple[str, list]]: (query, params) pairs, to run in order.
+        """
+        mark = self.PLACEHOLDER
+        now, open_end = self._timestamp(now), self._timestamp(OPEN_END)
+
+        close_query = f"""
+            UPDATE countries_history SET valid_to = {mark}
+            WHERE valid_to = {mark} AND source = {mark} AND name IN {names_sql}
+              AND NOT EXISTS (
+                SELECT 1 FROM countries c
+                WHERE c.source = countries_history.source AND c.name = countries_history.name
+                  AND c.fingerprint = countries_history.fingerprint
+              )
+        """
+        open_query = f"""
+            INSERT INTO countries_history ({HISTORY_COLUMNS})
+            SELECT c.source, c.name, c.capital, c.population, c.area, c.fingerprint, {mark}, {mark}
+            FROM countries c
+            WHERE c.source = {mark} AND c.name IN {names_sql}
+              AND NOT EXISTS (
+                SELECT 1 FROM countries_history h
+                WHERE h.source = c.source AND h.name = c.name AND h.valid_to = {mark}
+              )
+        """
+        return [
+            (close_query, [now, open_end, source, *names_params]),
+            (open_query, [now, open_end, source, *names_params, open_end]),
+        ]
+
+    def select_as_of(self, when: datetime.datetime, source: str = DEFAULT_SOURCE) -> List[CountryData]:
+        """ Read the countries of a source as they were stored at a point in time.
+
+            Args:
+                when (datetime.datetime): The point in time, in local time like updated_at.
+                source (str, optional): Name of the source.
+
+            Returns:
+                List[CountryData]: The countries valid at that time, ordered by name.
+        """
+        mark = self.PLACEHOLDER
+        rows = self._fetch_all(f"""
+            SELECT name, capital, population, area FROM countries_history
+            WHERE source = {mark} AND valid_to > {mark} AND valid_from <= {mark}
+            ORDER BY name
+        """, [source, self._timestamp(when), self._timestamp(when)])
+        return [CountryData(*row) for row in rows]
+
+    def select_history(self, name: str, source: str = DEFAULT_SOURCE) -> List[CountryVersion]:
+        """ Read all stored versions of a country, oldest first.
+
+            Returns:
+                List[CountryVersion]: The versions; the current one ends at OPEN_END.
+        """
+        mark = self.PLACEHOLDER
+        rows = self._fetch_all(f"""
+            SELECT name, capital, population, area, valid_from, valid_to FROM countries_history
+            WHERE source = {mark} AND name = {mark}
+            ORDER BY valid_from
+        """, [source, name])
+        return [
+            CountryVersion(CountryData(*row[:4]), self._from_timestamp(row[4]), self._from_timestamp(row[5]))
+            for row in rows
+        ]
+
+    def get_change_times(self, source: str = DEFAULT_SOURCE, limit: int = 100) -> List[datetime.datetime]:
+        """ The times at which countries of a source were added, changed or deleted, newest first.
+
+            These are the crawl runs which changed something, to pass to diff_between().
+        """
+        mark = self.PLACEHOLDER
+        rows = self._fetch_all(f"""
+            SELECT changed_at FROM (
+                SELECT valid_from AS changed_at FROM countries_history WHERE source = {mark}
+                UNION
+                SELECT valid_to AS changed_at FROM countries_history WHERE source = {mark} AND valid_to < {mark}
+            ) AS changes
+            ORDER BY changed_at DESC LIMIT {mark}
+        """, [source, source, self._timestamp(OPEN_END), limit])
+        return [self._from_timestamp(changed_at) for (changed_at,) in rows]
+
+    def diff_between(self, start: datetime.datetime, end: datetime.datetime,
+                     source: str = DEFAULT_SOURCE) -> CountriesDiff:
+        """ Compare the countries of a source at two points in time, e.g. two crawl runs.
+
+            Returns:
+                CountriesDiff: The countries added and changed from start to end (as of end),
+                the names of the removed ones and the number of unchanged ones.
+        """
+        mark = self.PLACEHOLDER
+        before = self._fetch_all(f"""
+            SELECT name, fingerprint FROM countries_history
+            WHERE source = {mark} AND valid_to > {mark} AND valid_from <= {mark}
+        """, [source, self._timestamp(start), self._timestamp(start)])
+        return diff_countries({name: stored or '' for name, stored in before}, self.select_as_of(end, source))
+
+    def iter_pages(self, page_size: int = 1000) -> Iterator[List[Tuple]]:
+        """Yield the whole 'countries' table page by page, without holding a connection in between.
+
+            Args:
+                page_size (int, optional): Number of rows per page. Defaults to 1000.
+
+            Yields:
+                List[Tuple]: The next page of rows, ordered by id.
+        """
+        after_id = 0
+        while True:
+            page = self.select_page(after_id, page_size)
+            if not page:
+                return
+            yield page
+            after_id = page[-1][0]
+
+    @classmethod
+    def _filter_condition(cls, column: str, text: str) -> Tuple[str, list]:
+        """Builds an index-friendly WHERE condition for the filter box of the table view.
+
+            - text columns match by prefix: "bul" -> name LIKE 'bul%'
+            - numeric columns take an optional operator: "1000", ">1000", "<=5.5"
+            - time columns match from a date on: "2024-05-01" -> updated_at >= '2024-05-01'
+        """
+        text = text.strip()
+        mark = cls.PLACEHOLDER
+
+        if column in cls.TEXT_COLUMNS:
+            # '!' rather than backslash: the escape character every backend reads the same way
+            escaped = text.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+            return f"{column} {cls.LIKE_OPERATOR} {mark} ESCAPE '!'", [escaped + '%']
+
+        if column in cls.NUMERIC_COLUMNS:
+            for operator in ('>=', '<=', '>', '<', '='):
+                if text.startswith(operator):
+                    number_text = text[len(operator):].strip()
+                    break
+            else:
+                operator, number_text = '=', text
+            try:
+                number = float(number_text)
+            except ValueError:
+                return '1 = 0', []
+            return f'{column} {operator} {mark}', [number]
+
+        if column in cls.TIME_COLUMNS:
+            return f'{column} >= {mark}', [text]
+
+        raise ValueError(f"Cannot filter on column '{column}'")
+
+    @classmethod
+    def _build_window_query(cls, order_by: str, descending: bool, filter_column: Optional[str],
+                            filter_text: str, after: Optional[Tuple], limit: int) -> Tuple[str, list]:
+        """Builds the query behind select_window(). See there for the arguments."""
+        if not cls.can_query(order_by):
+            raise ValueError(f"Cannot sort on column '{order_by}'")
+
+        mark = cls.PLACEHOLDER
+        conditions: List[str] = []
+        params: list = []
+
+        if filter_column and filter_text.strip():
+            condition, condition_params = cls._filter_condition(filter_column, filter_text)
+            conditions.append(condition)
+            params.extend(condition_params)
+
+        if after is not None:
+            last_value, last_id = after
+            # keyset condition for "ORDER BY order_by, id", NULLs sort first when ascending
+            if order_by == 'id':
+                conditions.append(f'id < {mark}' if descending else f'id > {mark}')
+                params.append(last_id)
+            elif not descending and last_value is None:
+                conditions.append(f'(({order_by} IS NULL AND id > {mark}) OR {order_by} IS NOT NULL)')
+                params.append(last_id)
+            elif not descending:
+                conditions.append(f'({order_by} > {mark} OR ({order_by} = {mark} AND id > {mark}))')
+                params.extend([last_value, last_value, last_id])
+            elif last_value is None:
+                conditions.append(f'({order_by} IS NULL AND id < {mark})')
+                params.append(last_id)
+            else:
+                conditions.append(
+                    f'({order_by} < {mark} OR ({order_by} = {mark} AND id < {mark}) OR {order_by} IS NULL)'
+                )
+                params.extend([last_value, last_value, last_id])
+
+        direction = 'DESC' if descending else 'ASC'
+        if cls.NULLS_ORDER:
+            # DuckDB sorts NULLs last by default, the keyset conditions expect them as the smallest values
+            direction += ' NULLS LAST' if descending else ' NULLS FIRST'
+        order_clause = f'id {direction}' if order_by == 'id' else f'{order_by} {direction}, id {direction}'
+
+        where_clause = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+
+        query = f'SELECT * FROM countries {where_clause}ORDER BY {order_clause} LIMIT {mark};'
+        params.append(limit)
+
+        return query, params
+
+
+def create_storage(config_file: str = 'src/config.ini', section: str = 'storage') -> Storage:
+    """ Creates the storage backend selected in the configuration file.
+
+        Args:
+            config_file (str): Path to the configuration file.
+            section (str, optional): Name of the section selecting the backend. Defaults to "storage".
+
+        Returns:
+            Storage: The backend; MySQL if the section has no 'backend' key.
+
+        Raises:
+            ConfigError: If the backend is unknown.
+            ConnectionError: If the database cannot be opened.
+    """
+    storage_config = load_config(config_file, section)
+    backend = storage_config.get('backend', 'mysql').strip().lower()
+
+    if backend == 'mysql':
+        from src.db.db import DB
+        return DB(config_file, section=storage_config.get('mysql_section', 'mysql'))
+    if backend == 'sqlite':
+        from src.db.sqlite_storage import SQLiteStorage
+        return SQLiteStorage.from_config(config_file, section)
+    if backend == 'duckdb':
+        from src.db.duckdb_storage import DuckDBStorage
+        return DuckDBStorage.from_config(config_file, section)
+
+    raise ConfigError(f"Unknown storage backend '{backend}', expected one of: {', '.join(BACKENDS)}")
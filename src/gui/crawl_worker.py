@@ -0,0 +1,52 @@
+""" module crawl_worker.py """
+import logging
+import threading
+
+from PyQt6 import QtCore as qtc
+
+from src.data_processing.data_processor import CrawlCancelled, DataProcessor
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('crawl_worker', logging.INFO)
+
+
+class CrawlWorkerSignals(qtc.QObject):
+    """Signals emitted by a CrawlWorker. They are delivered on the GUI thread."""
+
+    # stage name ('fetch', 'parse', 'insert', 'done') and its row count
+    progress = qtc.pyqtSignal(str, int)
+    finished = qtc.pyqtSignal()
+    cancelled = qtc.pyqtSignal()
+    failed = qtc.pyqtSignal(str)
+
+
+class CrawlWorker(qtc.QRunnable):
+    """Runs DataProcessor.run() on a QThreadPool thread, keeping the GUI responsive."""
+
+    def __init__(self, data_processor: DataProcessor) -> None:
+        super().__init__()
+        # the GUI keeps a reference to the worker to cancel it
+        self.setAutoDelete(False)
+
+        self.data_processor = data_processor
+        self.signals = CrawlWorkerSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self) -> None:
+        """Asks the pipeline to stop before its next stage."""
+        self.cancel_event.set()
+
+    def run(self) -> None:
+        try:
+            self.data_processor.run(
+                progress_callback=self.signals.progress.emit,
+                cancel_event=self.cancel_event,
+            )
+        except CrawlCancelled:
+            logger.info('Crawl cancelled')
+            self.signals.cancelled.emit()
+        except Exception as e:
+            logger.error('Crawl failed: %s', e)
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit()
@@ -6,12 +6,13 @@ from PyQt6 import QtWidgets as qtw
 from PyQt6 import QtCore as qtc
 from PyQt6 import QtGui as qtg
 
-from src.db.db import DB
+from src.db.storage import create_storage
+from src.gui.table_model import CountriesTableModel
 
 from src.utils.setup_logging import setup_logger
 
 
-logger = setup_logger('data_table', logging.DEBUG)
+logger = setup_logger('data_table', logging.INFO)
 
 
 class TableView(qtw.QTableView):
@@ -27,7 +28,7 @@ class TableView(qtw.QTableView):
 
     def initialize_database(self):
         try:
-            db = DB('src/config.ini', section='mysql')
+            db = create_storage('src/config.ini', section='storage')
         except Exception as e:
             self.handle_database_error(str(e))
             raise Exception("Database connection failed")
@@ -42,66 +43,70 @@ class TableView(qtw.QTableView):
         )
 
     def initialize_model(self):
-        self.data = self.db.select_all_data()
-        logger.debug('model data loaded: %s', self.data[:10])   # type:ignore
         self.column_names = self.db.get_column_names()
 
-        model = self.setup_model()
+        # filtering and sorting are done by the database, see CountriesTableModel
+        self.table_model = CountriesTableModel(self.db, self.column_names, parent=self)
+        self.setModel(self.table_model)
 
-        self.filter_proxy_model = qtc.QSortFilterProxyModel(self)
-        self.filter_proxy_model.setSourceModel(model)
-        self.filter_proxy_model.setFilterCaseSensitivity(qtc.Qt.CaseSensitivity.CaseInsensitive)
-        self.filter_proxy_model.setFilterKeyColumn(1)  # filter on the second column initially
+        # filter on the country name initially
+        self.filter_column = self.column_names.index('name') if 'name' in self.column_names else 1
+        self.filter_text = ''
 
-        self.setModel(self.filter_proxy_model)
+        # wait for a typing pause before querying the database
+        self.filter_timer = qtc.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(300)
+        self.filter_timer.timeout.connect(self.apply_filter)
 
-    def setup_model(self):
-        model = qtg.QStandardItemModel()
-        model.setHorizontalHeaderLabels(self.column_names)
+    def reload(self):
+        """Reloads the table data from the database, e.g. after a crawl."""
+        self.table_model.reload()
 
-        if self.data:
-            for i, row in enumerate(self.data):
-                ### if we do not care of item types, but just want to stringify them:
-                items = [qtg.QStandardItem(str(item)) for item in row]
-                logger.debug('ROW: %s', row)
-
-                ### handle diffrent item types
-                # items = []
-                # for field in row:
-                #     item = qtg.QStandardItem()
-                #     if isinstance(field, datetime.date):
-                #         field = field.strftime('%d.%m.%Y')
-                #     elif isinstance(field, str) and len(field)>100:
-                #         # set full string with UserRole for later use:
-                #         item.setData(field, qtc.Qt.ItemDataRole.UserRole)
-                #         # trim string for display
-                #         field = field[0:50]+'...'
-
-
-                #     item.setData(field, qtc.Qt.ItemDataRole.DisplayRole)
-                #     items.append(item)
-
-                model.insertRow(i, items)
-
-        return model
+    @qtc.pyqtSlot()
+    def apply_filter(self):
+        self.table_model.set_filter(self.filter_column if self.filter_text else None, self.filter_text)
 
+    @qtc.pyqtSlot(str)
+    def set_filter_text(self, text):
+        self.filter_text = text
+        self.filter_timer.start()
 
     def setupUI(self):
         ### set table dimensions:
 
         # self.resizeColumnToContents(0)
-        self.resizeColumnToContents(1)
+        self.resizeColumnToContents(self.filter_column)
         # self.setColumnWidth(3, 300)
 
-        self.verticalHeader().setSectionResizeMode(qtw.QHeaderView.ResizeMode.ResizeToContents); #type:ignore
+        # fixed row heights: no per-row size measuring
+        vertical_header = self.verticalHeader()
+        vertical_header.setSectionResizeMode(qtw.QHeaderView.ResizeMode.Fixed)  #type:ignore
+        vertical_header.setDefaultSectionSize(self.fontMetrics().height() + 8)  #type:ignore
 
-        # enable columns sort
+        # enable columns sort (the model queries the database in the new order)
         self.setSortingEnabled(True)
         self.sortByColumn(0,qtc.Qt.SortOrder.AscendingOrder)
+        self.horizontalHeader().sortIndicatorChanged.connect(self.check_sort_indicator)  #type:ignore
+
+    @qtc.pyqtSlot(int, qtc.Qt.SortOrder)
+    def check_sort_indicator(self, column, order):
+        """Moves the sort indicator back if the model rejected sorting on column."""
+        sort_column = self.table_model.sort_column()
+        if column != sort_column:
+            header = self.horizontalHeader()
+            header.blockSignals(True)  #type:ignore
+            header.setSortIndicator(  #type:ignore
+                sort_column,
+                qtc.Qt.SortOrder.DescendingOrder if self.table_model.descending else qtc.Qt.SortOrder.AscendingOrder,
+            )
+            header.blockSignals(False)  #type:ignore
 
     @qtc.pyqtSlot(int)
     def set_filter_column(self,index):
-        self.filter_proxy_model.setFilterKeyColumn(index)
+        self.filter_column = index
+        if self.filter_text:
+            self.filter_timer.start()
 
     def get_last_updated_date(self) -> str:
         """Retrieve the last updated date from the database or the current date and time.
@@ -110,7 +115,7 @@ class TableView(qtw.QTableView):
                 str: A string representing the last updated date or the current date and time.
         """
         try:
-            last_updated_date: Optional[str] = self.db.get_last_updated_date()
+            last_updated_date: Optional[datetime.datetime] = self.db.get_last_updated_date()
         except Exception:
             last_updated_date = None
 
@@ -147,12 +152,12 @@ class DataTable(qtw.QWidget):
 
         filterLineEdit = qtw.QLineEdit()
         filterLineEdit.textChanged.connect(
-            self.tableView.filter_proxy_model.setFilterRegularExpression
+            self.tableView.set_filter_text
         )
 
         comboBox = qtw.QComboBox()
         comboBox.addItems(["{0}".format(col) for col in self.tableView.column_names])
-        comboBox.setCurrentText('title')
+        comboBox.setCurrentIndex(self.tableView.filter_column)
         comboBox.currentIndexChanged.connect(
             lambda idx:self.tableView.set_filter_column(idx)
         )
@@ -200,7 +205,7 @@ class DataTable(qtw.QWidget):
 
     @qtc.pyqtSlot(int)
     def on_comboBox_currentIndexChanged(self,index):
-        self.tableView.filter_proxy_model.setFilterKeyColumn(index)
+        self.tableView.set_filter_column(index)
 
 
 
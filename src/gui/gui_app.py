@@ -10,9 +10,10 @@ from src.data_processing.data_processor import DataProcessor
 from src.utils.config_loader import load_config
 from src.utils.setup_logging import setup_logger
 
+from src.gui.crawl_worker import CrawlWorker
 from src.gui.data_table import DataTable
 
-logger = setup_logger('qui_app', logging.DEBUG)
+logger = setup_logger('gui_app', logging.INFO)
 
 class MainWindow(qtw.QMainWindow):
     def __init__(self , *args, **kwargs):
@@ -23,11 +24,13 @@ class MainWindow(qtw.QMainWindow):
 
         self.data_processor = DataProcessor(target_url = target_url)
         self.data_table = None
+        self.crawl_worker = None
         self.setupUI()
 
         # Connect signals:
         self.btnShowData.clicked.connect(self.show_data)
         self.btnCrawlerRun.clicked.connect( self.run_crawler )
+        self.btnCrawlerCancel.clicked.connect( self.cancel_crawler )
 
         self.show()
 
@@ -45,10 +48,18 @@ class MainWindow(qtw.QMainWindow):
         self.btnShowData = qtw.QPushButton('Show Data')
         # self.btnShowData.setEnabled(False)
 
+        self.btnCrawlerCancel = qtw.QPushButton('Cancel')
+        self.btnCrawlerCancel.setEnabled(False)
+
         btnsLayout.addWidget(self.btnCrawlerRun)
+        btnsLayout.addWidget(self.btnCrawlerCancel)
         btnsLayout.addWidget(self.btnShowData)
         layout.addLayout(btnsLayout)
 
+        self.lblCrawlerStatus = qtw.QLabel('')
+        self.lblCrawlerStatus.setAlignment(qtc.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.lblCrawlerStatus)
+
         # add spacer or just fixed spacing
         layout.addSpacing(10)
         # layout.addSpacerItem(qtw.QSpacerItem(0, 0, qtw.QSizePolicy.Expanding, qtw.QSizePolicy.Expanding))
@@ -82,11 +93,52 @@ class MainWindow(qtw.QMainWindow):
 
     @qtc.pyqtSlot()
     def run_crawler(self):
-        self.setCursor(qtc.Qt.CursorShape.WaitCursor)
+        self.crawl_worker = CrawlWorker(self.data_processor)
+        self.crawl_worker.signals.progress.connect(self.on_crawler_progress)
+        self.crawl_worker.signals.finished.connect(self.on_crawler_finished)
+        self.crawl_worker.signals.cancelled.connect(
+            lambda: self.on_crawler_stopped('Crawl cancelled')
+        )
+        self.crawl_worker.signals.failed.connect(
+            lambda error: self.on_crawler_stopped(f'Crawl failed: {error}')
+        )
+
+        self.btnCrawlerRun.setEnabled(False)
+        self.btnCrawlerCancel.setEnabled(True)
+        self.setCursor(qtc.Qt.CursorShape.BusyCursor)
+
+        qtc.QThreadPool.globalInstance().start(self.crawl_worker)
+
+    @qtc.pyqtSlot()
+    def cancel_crawler(self):
+        if self.crawl_worker:
+            self.lblCrawlerStatus.setText('Cancelling...')
+            self.crawl_worker.cancel()
+
+    @qtc.pyqtSlot(str, int)
+    def on_crawler_progress(self, stage, count):
+        messages = {
+            'fetch': 'Fetching page...',
+            'parse': 'Parsing page...',
+            'insert': f'Saving {count} countries...',
+            'done': f'Done: {count} countries crawled',
+        }
+        self.lblCrawlerStatus.setText(messages.get(stage, stage))
+
+    @qtc.pyqtSlot()
+    def on_crawler_finished(self):
+        self.on_crawler_stopped(self.lblCrawlerStatus.text())
 
-        self.data_processor.run()
+        # show the new data in an open table
+        if self.data_table and self.data_table.isVisible():
+            self.data_table.tableView.reload()
 
+    def on_crawler_stopped(self, message):
+        self.lblCrawlerStatus.setText(message)
+        self.btnCrawlerRun.setEnabled(True)
+        self.btnCrawlerCancel.setEnabled(False)
         self.setCursor(qtc.Qt.CursorShape.ArrowCursor)
+        self.crawl_worker = None
 
 
 class MainApp(qtw.QApplication):
@@ -0,0 +1,193 @@
+""" module table_model.py """
+import datetime
+import logging
+from typing import Any, List, Optional, Tuple
+
+from PyQt6 import QtCore as qtc
+
+from src.db.storage import Storage
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('table_model', logging.INFO)
+
+
+class _WindowLoaderSignals(qtc.QObject):
+    # query generation and the loaded rows
+    loaded = qtc.pyqtSignal(int, object)
+
+
+class _WindowLoader(qtc.QRunnable):
+    """Runs one Storage.select_window() query on the thread pool."""
+
+    def __init__(self, db: Storage, generation: int, **query) -> None:
+        super().__init__()
+        self.setAutoDelete(False)
+
+        self.db = db
+        self.generation = generation
+        self.query = query
+        self.signals = _WindowLoaderSignals()
+
+    def run(self) -> None:
+        try:
+            rows = self.db.select_window(**self.query)
+        except Exception as e:
+            logger.error('Failed to load rows: %s', e)
+            rows = []
+        self.signals.loaded.emit(self.generation, rows)
+
+
+class CountriesTableModel(qtc.QAbstractTableModel):
+    """Read-only table model which loads the 'countries' table window by window.
+
+        Filtering and sorting are done by the database (Storage.select_window): changing
+        the filter or clicking a column header starts a new query, and rows are
+        fetched only when the view scrolls near the end of the loaded data
+        (canFetchMore/fetchMore). Queries run on the thread pool; results of a query
+        which was superseded by a newer filter or sort order are dropped.
+
+        Values are kept column by column in plain lists instead of one QStandardItem
+        per cell, and display strings are produced on demand in data().
+    """
+
+    def __init__(self, db: Storage, column_names: List[str], page_size: int = 500, parent=None) -> None:
+        super().__init__(parent)
+
+        self.db = db
+        self.column_names = column_names
+        self.page_size = page_size
+
+        self.order_by = 'id'
+        self.descending = False
+        self.filter_column: Optional[str] = None
+        self.filter_text = ''
+
+        # incremented by every new query, to recognize stale results
+        self.generation = 0
+        self.loading = False
+        self._loaders = set()
+
+        self._clear()
+
+    def _clear(self) -> None:
+        self.columns: List[List[Any]] = [[] for _ in self.column_names]
+        self.row_count = 0
+        self.last_key: Optional[Tuple] = None
+        self.exhausted = False
+
+    def rowCount(self, parent=qtc.QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=qtc.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.column_names)
+
+    def data(self, index: qtc.QModelIndex, role=qtc.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        value = self.columns[index.column()][index.row()]
+
+        if role == qtc.Qt.ItemDataRole.DisplayRole:
+            if isinstance(value, datetime.datetime):
+                return value.strftime('%d.%m.%Y %H:%M:%S')
+            return '' if value is None else str(value)
+        if role == qtc.Qt.ItemDataRole.UserRole:
+            return value
+        if role == qtc.Qt.ItemDataRole.TextAlignmentRole and isinstance(value, (int, float)):
+            return qtc.Qt.AlignmentFlag.AlignRight | qtc.Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section: int, orientation: qtc.Qt.Orientation, role=qtc.Qt.ItemDataRole.DisplayRole):
+        if role != qtc.Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == qtc.Qt.Orientation.Horizontal:
+            return self.column_names[section] if section < len(self.column_names) else None
+        return section + 1
+
+    def canFetchMore(self, parent=qtc.QModelIndex()) -> bool:
+        return not parent.isValid() and not self.exhausted and not self.loading
+
+    def fetchMore(self, parent=qtc.QModelIndex()) -> None:
+        if parent.isValid() or self.exhausted or self.loading:
+            return
+
+        self.loading = True
+        loader = _WindowLoader(
+            self.db,
+            self.generation,
+            order_by=self.order_by,
+            descending=self.descending,
+            filter_column=self.filter_column,
+            filter_text=self.filter_text,
+            after=self.last_key,
+            limit=self.page_size,
+        )
+        loader.signals.loaded.connect(self._on_loaded)
+        self._loaders.add(loader)
+        loader.signals.loaded.connect(lambda *_: self._loaders.discard(loader))
+
+        qtc.QThreadPool.globalInstance().start(loader)
+
+    @qtc.pyqtSlot(int, object)
+    def _on_loaded(self, generation: int, rows: List[Tuple]) -> None:
+        if generation != self.generation:
+            logger.debug('Dropping %s rows of a superseded query', len(rows))
+            return
+
+        self.loading = False
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        if not rows:
+            return
+
+        self.beginInsertRows(qtc.QModelIndex(), self.row_count, self.row_count + len(rows) - 1)
+        for column, values in zip(self.columns, zip(*rows)):
+            column.extend(values)
+        self.row_count += len(rows)
+        sort_index = self.column_names.index(self.order_by)
+        self.last_key = (rows[-1][sort_index], rows[-1][0])
+        self.endInsertRows()
+
+        logger.debug('Loaded %s rows, %s in total', len(rows), self.row_count)
+
+    def reload(self) -> None:
+        """Drops the loaded rows and runs the current query again."""
+        self.generation += 1
+        self.loading = False
+
+        self.beginResetModel()
+        self._clear()
+        self.endResetModel()
+
+        self.fetchMore()
+
+    def set_filter(self, column: Optional[int], text: str) -> bool:
+        """Filters the rows on a column, see Storage._filter_condition() for the filter syntax.
+
+            Returns:
+                bool: False if the storage cannot filter on the column; the current filter is kept.
+        """
+        filter_column = self.column_names[column] if column is not None else None
+        if filter_column is not None and not self.db.can_query(filter_column):
+            logger.warning("Cannot filter on column '%s'", filter_column)
+            return False
+
+        self.filter_column = filter_column
+        self.filter_text = text
+        self.reload()
+        return True
+
+    def sort_column(self) -> int:
+        """The index of the column the rows are sorted on."""
+        return self.column_names.index(self.order_by)
+
+    def sort(self, column: int, order=qtc.Qt.SortOrder.AscendingOrder) -> None:
+        # the view calls sort() on every header click; keep the current order for columns
+        # the storage cannot sort on (TableView puts the sort indicator back)
+        if not self.db.can_query(self.column_names[column]):
+            logger.warning("Cannot sort on column '%s'", self.column_names[column])
+            return
+
+        self.order_by = self.column_names[column]
+        self.descending = order == qtc.Qt.SortOrder.DescendingOrder
+        self.reload()
@@ -1,10 +1,50 @@
 """ module shared_types """
 
-from typing import TypedDict
+import datetime
+from typing import List, NamedTuple, TypedDict
 
-class CountryData(TypedDict):
-    """Custom type for CountryData"""
+# source of the countries crawled from [data_processing] target_url
+DEFAULT_SOURCE = 'default'
+
+class CountryData(NamedTuple):
+    """Custom type for CountryData
+
+        A NamedTuple rather than a dict: rows are created by the million on the hot
+        path, and tuples are smaller and faster to build and compare.
+    """
     name: str
     capital: str
-    population: str
+    population: int
     area: float
+
+
+class UpsertStats(TypedDict):
+    """Number of rows inserted, updated and left unchanged by a bulk load"""
+    inserted: int
+    updated: int
+    unchanged: int
+
+
+class CountriesDiff(TypedDict):
+    """Difference between a crawl and the stored countries"""
+    added: List[CountryData]
+    changed: List[CountryData]
+    removed: List[str]
+    unchanged: int
+
+
+class CountryVersion(NamedTuple):
+    """A country as it was stored from valid_from until (excluding) valid_to"""
+    country: CountryData
+    valid_from: datetime.datetime
+    # storage.OPEN_END for the current version
+    valid_to: datetime.datetime
+
+
+class SnapshotInfo(TypedDict):
+    """Metadata of an archived crawl of a page"""
+    id: str
+    url: str
+    fetched_at: float
+    size: int
+    compressed_size: int
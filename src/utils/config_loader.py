@@ -7,7 +7,7 @@ import logging
 
 from src.utils.setup_logging import setup_logger
 
-logger = setup_logger('config_loader', logging.DEBUG)
+logger = setup_logger('config_loader', logging.INFO)
 
 class ConfigError(Exception):
     """Custom exception for errors related to configuration loading and parsing."""
@@ -0,0 +1,164 @@
+""" module metrics
+
+    Lightweight timers and counters for instrumenting the crawl pipeline.
+
+    Measurements are collected in a process wide registry, `metrics`, and can be
+    exported as a Prometheus text file (for the node_exporter textfile collector)
+    or as a JSON summary:
+
+        >>> @metrics.timed('fetch')
+        ... def get_html(self): ...
+        >>> with metrics.timer('parse'):
+        ...     data = scraper.get_countries_data()
+        >>> metrics.inc('rows_scraped', len(data))
+        >>> metrics.write_prometheus('data/metrics/countries_crawler.prom')
+
+    Timers are exported in seconds as Prometheus summaries (_count, _sum) plus a _max
+    gauge, counters as Prometheus counters (_total).
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, TypedDict, TypeVar
+
+from src.utils.setup_logging import setup_logger
+
+logger = setup_logger('metrics', logging.INFO)
+
+F = TypeVar('F', bound=Callable)
+
+_METRIC_NAME_RE = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*$')
+
+
+class TimerStats(TypedDict):
+    """Accumulated durations of a timer, in seconds"""
+    count: int
+    sum: float
+    max: float
+
+
+class Metrics:
+    """A thread-safe registry of timers, counters and gauges."""
+
+    def __init__(self, prefix: str = 'countries_crawler') -> None:
+        """ Initializes an empty registry.
+
+            Args:
+                prefix (str): Prefix of the exported Prometheus metric names.
+        """
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drops all measurements, e.g. at the start of a pipeline run."""
+        with self._lock:
+            self.timers: Dict[str, TimerStats] = {}
+            self.counters: Dict[str, float] = {}
+            self.gauges: Dict[str, float] = {}
+
+    @staticmethod
+    def _check_name(name: str) -> None:
+        if not _METRIC_NAME_RE.match(name):
+            raise ValueError(f"Invalid metric name '{name}'")
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Adds one duration to the timer name."""
+        self._check_name(name)
+        with self._lock:
+            stats = self.timers.setdefault(name, {'count': 0, 'sum': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['sum'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        """Increments the counter name."""
+        self._check_name(name)
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name: str, value: float) -> None:
+        """Sets the gauge name."""
+        self._check_name(name)
+        with self._lock:
+            self.gauges[name] = value
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Times the enclosed block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name: str) -> Callable[[F], F]:
+        """Decorator timing every call of a function."""
+        def decorator(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper  # type: ignore
+        return decorator
+
+    def summary(self) -> dict:
+        """Returns a JSON serializable copy of all measurements."""
+        with self._lock:
+            return {
+                'timers': {name: dict(stats) for name, stats in self.timers.items()},
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+    def to_prometheus(self) -> str:
+        """Formats all measurements in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = []
+        for name, stats in sorted(summary['timers'].items()):
+            metric = f'{self.prefix}_{name}_seconds'
+            lines += [
+                f'# TYPE {metric} summary',
+                f"{metric}_count {stats['count']}",
+                f"{metric}_sum {stats['sum']:.6f}",
+                f'# TYPE {metric}_max gauge',
+                f"{metric}_max {stats['max']:.6f}",
+            ]
+        for name, value in sorted(summary['counters'].items()):
+            metric = f'{self.prefix}_{name}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric} {self._format_value(value)}']
+        for name, value in sorted(summary['gauges'].items()):
+            metric = f'{self.prefix}_{name}'
+            lines += [f'# TYPE {metric} gauge', f'{metric} {self._format_value(value)}']
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _write_atomic(path: str, text: str) -> None:
+        # write next to the target and rename, so a scraper never reads a half written file
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def write_prometheus(self, path: str) -> None:
+        """Writes the measurements as a Prometheus text file."""
+        self._write_atomic(path, self.to_prometheus())
+
+    def write_summary(self, path: str, **extra) -> None:
+        """Writes the measurements as JSON, together with extra top level fields."""
+        self._write_atomic(path, json.dumps({**extra, **self.summary()}, indent=2, sort_keys=True))
+
+
+# the registry used by the pipeline modules
+metrics = Metrics()
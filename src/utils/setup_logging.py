@@ -1,14 +1,146 @@
-""" module setup_logging """
+""" module setup_logging
 
+    Central logging setup of the application.
+
+    All module loggers propagate to a single QueueHandler on the root logger. The
+    QueueHandler only puts the record on a queue; formatting and writing to stderr
+    (or a log file) happen on the thread of a QueueListener, off the crawl and GUI
+    threads. The listener is started on the first setup_logger() call and stopped,
+    after draining the queue, at interpreter exit.
+
+    The [logging] section of src/config.ini controls the output:
+
+        format = text | json
+        level = WARNING                  # optional, overrides the levels of all module loggers
+        levels = crawler:DEBUG, db:INFO  # optional, per logger
+        file = data/logs/crawler.log     # optional, log to this file instead of stderr
+"""
+
+import atexit
+import configparser
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Dict, Optional
+
+CONFIG_FILE = 'src/config.ini'
+TEXT_FORMAT = '%(name)s:%(levelname)s:%(message)s'
+
+_setup_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_logging_config: Dict[str, str] = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler which leaves the message formatting to the listener thread.
+
+        The standard QueueHandler formats every record before queueing it, so that
+        it can be pickled to another process; the queue here never leaves the process.
+        Log arguments are therefore formatted later: pass values, not objects which
+        are modified right after the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _read_logging_config(config_file: str) -> Dict[str, str]:
+    # configparser directly: config_loader logs, and would import this module back
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    return dict(config['logging']) if config.has_section('logging') else {}
+
+
+def configure_logging(config_file: str = CONFIG_FILE) -> None:
+    """ Installs the queue handler and starts the listener thread, once per process.
+
+        Args:
+            config_file (str): Configuration file with an optional [logging] section.
+    """
+    global _listener, _logging_config
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        _logging_config = _read_logging_config(config_file)
+
+        if _logging_config.get('file'):
+            os.makedirs(os.path.dirname(_logging_config['file']) or '.', exist_ok=True)
+            output_handler: logging.Handler = logging.FileHandler(_logging_config['file'], encoding='utf-8')
+        else:
+            output_handler = logging.StreamHandler()
+
+        if _logging_config.get('format', 'text').lower() == 'json':
+            output_handler.setFormatter(JsonFormatter())
+        else:
+            output_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        root = logging.getLogger()
+        # replace handlers of an earlier setup instead of writing every record twice
+        for handler in list(root.handlers):
+            if isinstance(handler, _DeferredQueueHandler):
+                root.removeHandler(handler)
+        root.addHandler(_DeferredQueueHandler(log_queue))
+        root.setLevel(logging.WARNING)   # third party libraries
+
+        _listener = logging.handlers.QueueListener(log_queue, output_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Writes the queued records and stops the listener thread."""
+    global _listener
+
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _configured_level(name: str, default: int) -> int:
+    levels = {}
+    for item in _logging_config.get('levels', '').split(','):
+        if ':' in item:
+            logger_name, level_name = item.split(':', 1)
+            levels[logger_name.strip()] = level_name.strip().upper()
+
+    level_name = levels.get(name) or _logging_config.get('level', '').strip().upper()
+    level = logging.getLevelName(level_name) if level_name else default
+    return level if isinstance(level, int) else default
+
 
 def setup_logger(name, level):
     """
     Set up and configure a logger with the specified name and logging level.
 
+    Calling it again for the same name returns the same logger without adding handlers:
+    records go through the shared queue handler set up by configure_logging().
+
     Parameters:
         name (str): The name of the logger.
-        level (int): The logging level to set for the logger.
+        level (int): The default logging level of the logger, see the [logging] section.
 
     Returns:
         logging.Logger: A configured logger instance.
@@ -17,26 +149,10 @@ def setup_logger(name, level):
         To set up a logger named 'my_logger' with INFO level:
         >>> my_logger = setup_logger('my_logger', logging.INFO)
     """
-    # Create a logger
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
+    configure_logging()
 
-    # Create a console handler and set the level
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(level)
-
-    # Create a formatter and set the format
-    format_str = '%(name)s:%(levelname)s:%(message)s'
-    formatter = logging.Formatter(format_str)
-    console_handler.setFormatter(formatter)
-
-    # Add the handler to the logger
-    logger.addHandler(console_handler)
-
-    # Modify the formatter to include path:lineno for DEBUG messages
-    # if level == logging.DEBUG:
-    #     format_str += '\n%(pathname)s:%(lineno)d'
-    #     formatter = logging.Formatter(format_str)
-    #     console_handler.setFormatter(formatter)
+    logger = logging.getLogger(name)
+    logger.setLevel(_configured_level(name, level))
+    logger.propagate = True
 
     return logger
@@ -0,0 +1,92 @@
+"""Tests of the circuit breaker handling of Crawler._get()."""
+
+import io
+import time
+import unittest
+
+import requests
+
+from src.data_processing.crawler import Crawler
+from src.data_processing.resilience import CircuitBreaker, CircuitOpenError, FetchPolicy, RetryPolicy
+
+URL = 'http://example.test/'
+HOST = 'example.test'
+RESET_TIMEOUT = 0.05
+
+
+def make_response(status_code: int, headers: dict = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(b'')
+    return response
+
+
+class FakeSession:
+    """Answers every GET with the given response, or raises the given exception."""
+
+    def __init__(self, outcome) -> None:
+        self.outcome = outcome
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        if isinstance(self.outcome, BaseException):
+            raise self.outcome
+        return self.outcome
+
+
+class HalfOpenTrialTest(unittest.TestCase):
+    """The trial request of a half open circuit must never leave the circuit stuck open."""
+
+    def setUp(self) -> None:
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=RESET_TIMEOUT)
+        self.policy = FetchPolicy(retry=RetryPolicy(max_retries=0), circuit_breaker=self.breaker)
+
+        # open the circuit and wait until the next request is the trial
+        self.breaker.record_failure(HOST)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request(HOST)
+        time.sleep(RESET_TIMEOUT * 1.5)
+
+    def crawler(self, outcome) -> Crawler:
+        return Crawler(URL, session=FakeSession(outcome), policy=self.policy)  # type: ignore
+
+    def test_trial_success_closes_circuit(self) -> None:
+        response = self.crawler(make_response(200))._get(URL, {})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.breaker.before_request(HOST))
+
+    def test_trial_429_releases_trial(self) -> None:
+        response = self.crawler(make_response(429, {'Retry-After': '0'}))._get(URL, {})
+
+        self.assertEqual(response.status_code, 429)
+        # neither success nor failure: the next request is a new trial
+        self.assertTrue(self.breaker.before_request(HOST))
+
+    def test_trial_request_error_reopens_circuit(self) -> None:
+        with self.assertRaises(requests.exceptions.TooManyRedirects):
+            self.crawler(requests.exceptions.TooManyRedirects('loop'))._get(URL, {})
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request(HOST)
+        time.sleep(RESET_TIMEOUT * 1.5)
+        self.assertTrue(self.breaker.before_request(HOST))
+
+    def test_trial_unexpected_error_releases_trial(self) -> None:
+        with self.assertRaises(ValueError):
+            self.crawler(ValueError('broken adapter'))._get(URL, {})
+
+        self.assertTrue(self.breaker.before_request(HOST))
+
+    def test_trial_connection_error_reopens_circuit(self) -> None:
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.crawler(requests.exceptions.ConnectionError('refused'))._get(URL, {})
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request(HOST)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Equivalence tests of the parser backends and the stream engine on the saved pages in tests/fixtures."""
+
+import glob
+import os
+import unittest
+
+from src.data_processing.scraper import PARSER_BACKENDS, Scraper, ScraperError
+from src.data_processing.stream_scraper import StreamScraper
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# countries expected on each fixture page, after the threshold filter
+EXPECTED_COUNTS = {
+    'countries_60.html': 59,
+    'countries_quirks.html': 32,
+    'countries_threshold.html': 20,
+}
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class BackendEquivalenceTest(unittest.TestCase):
+    """Every backend, and StreamScraper, must extract exactly what the html.parser backend extracts."""
+
+    def test_fixtures_are_present(self) -> None:
+        self.assertEqual(
+            sorted(os.path.basename(path) for path in glob.glob(os.path.join(FIXTURE_DIR, '*.html'))),
+            sorted(EXPECTED_COUNTS),
+        )
+
+    def test_backends_agree(self) -> None:
+        for page_name, expected_count in EXPECTED_COUNTS.items():
+            html = read_fixture(page_name)
+            reference = Scraper(html, backend='html.parser').get_countries_data()
+            self.assertEqual(len(reference), expected_count, page_name)
+
+            for backend_name in PARSER_BACKENDS:
+                with self.subTest(page=page_name, backend=backend_name):
+                    try:
+                        data = Scraper(html, backend=backend_name).get_countries_data()
+                    except ScraperError as e:
+                        self.skipTest(str(e))
+                    self.assertEqual(data, reference)
+
+            with self.subTest(page=page_name, backend='stream'):
+                self.assertEqual(StreamScraper(html).get_countries_data(), reference)
+
+            with self.subTest(page=page_name, backend='stream, small chunks'):
+                chunks = [html[start:start + 100] for start in range(0, len(html), 100)]
+                self.assertEqual(StreamScraper(chunks).get_countries_data(), reference)
+
+    def test_quirky_markup(self) -> None:
+        data = Scraper(read_fixture('countries_quirks.html'), backend='html.parser').get_countries_data()
+        names = {country.name: country for country in data}
+
+        self.assertIn("Côte d'Ivoire", names)
+        self.assertEqual(names['Country 4 & Co'].capital, 'São Tomé')
+
+
+if __name__ == '__main__':
+    unittest.main()
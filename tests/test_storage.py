@@ -0,0 +1,117 @@
+"""Tests of the embedded storage backends: upserts, deletes and the countries_history queries."""
+
+import datetime
+import importlib.util
+import os
+import tempfile
+import time
+import unittest
+
+from src.db.change_detection import fingerprint
+from src.db.sqlite_storage import SQLiteStorage
+from src.db.storage import OPEN_END, Storage
+from src.shared_types import CountryData
+
+COUNTRIES = [
+    CountryData('Andorra', 'Andorra la Vella', 77265, 468.0),
+    CountryData('Belgium', 'Brussels', 11589623, 30528.0),
+    CountryData('Chile', 'Santiago', 19116201, 756102.0),
+]
+BELGIUM_2021 = CountryData('Belgium', 'Brussels', 11600000, 30528.0)
+DENMARK = CountryData('Denmark', 'Copenhagen', 5792202, 43094.0)
+
+
+def moment() -> datetime.datetime:
+    """A time strictly between the changes before and after it, which are stamped with datetime.now()."""
+    time.sleep(0.01)
+    now = datetime.datetime.now()
+    time.sleep(0.01)
+    return now
+
+
+class StorageTestMixin:
+    """The behaviour every backend must share; TestCases combine it with make_storage()."""
+
+    def make_storage(self, path: str) -> Storage:
+        """Opens the backend under test, with a batch smaller than the data so the stats span several batches."""
+        raise NotImplementedError
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = self.make_storage(os.path.join(self.tmp_dir.name, 'countries.db'))
+        self.storage.create_countries_table()
+        self.storage.migrate_countries_table()
+
+    def tearDown(self) -> None:
+        self.storage.close()
+        self.tmp_dir.cleanup()
+
+    def test_upsert_stats(self) -> None:
+        self.assertEqual(self.storage.insert_countries_data(COUNTRIES),
+                         {'inserted': 3, 'updated': 0, 'unchanged': 0})
+        self.assertEqual(self.storage.insert_countries_data([COUNTRIES[0], BELGIUM_2021, COUNTRIES[2], DENMARK]),
+                         {'inserted': 1, 'updated': 1, 'unchanged': 2})
+        self.assertEqual(self.storage.insert_countries_data([COUNTRIES[0], BELGIUM_2021, COUNTRIES[2], DENMARK]),
+                         {'inserted': 0, 'updated': 0, 'unchanged': 4})
+
+        self.assertEqual(self.storage.count_countries(), 4)
+        self.assertEqual(self.storage.get_fingerprints()['Belgium'], fingerprint(BELGIUM_2021))
+
+    def test_delete(self) -> None:
+        self.storage.insert_countries_data(COUNTRIES)
+        before = moment()
+
+        self.assertEqual(self.storage.delete_countries(['Belgium', 'Nowhere']), 1)
+        self.assertEqual(self.storage.delete_countries(['Belgium']), 0)
+
+        self.assertEqual(self.storage.count_countries(), 2)
+        self.assertNotIn('Belgium', self.storage.get_fingerprints())
+        history = self.storage.select_history('Belgium')
+        self.assertEqual(len(history), 1)
+        self.assertLess(history[0].valid_to, OPEN_END)
+        self.assertIn(COUNTRIES[1], self.storage.select_as_of(before))
+        self.assertNotIn(COUNTRIES[1], self.storage.select_as_of(moment()))
+
+    def test_select_as_of(self) -> None:
+        self.storage.insert_countries_data(COUNTRIES)
+        before = moment()
+        self.storage.insert_countries_data([BELGIUM_2021])
+        after = moment()
+
+        self.assertEqual(self.storage.select_as_of(before), COUNTRIES)
+        self.assertEqual(self.storage.select_as_of(after), [COUNTRIES[0], BELGIUM_2021, COUNTRIES[2]])
+        self.assertEqual([version.country for version in self.storage.select_history('Belgium')],
+                         [COUNTRIES[1], BELGIUM_2021])
+
+    def test_diff_between(self) -> None:
+        self.storage.insert_countries_data(COUNTRIES)
+        start = moment()
+        self.storage.insert_countries_data([BELGIUM_2021, DENMARK])
+        self.storage.delete_countries(['Chile'])
+        end = moment()
+
+        diff = self.storage.diff_between(start, end)
+
+        self.assertEqual(diff['added'], [DENMARK])
+        self.assertEqual(diff['changed'], [BELGIUM_2021])
+        self.assertEqual(diff['removed'], ['Chile'])
+        self.assertEqual(diff['unchanged'], 1)
+        self.assertEqual(len(self.storage.get_change_times()), 3)
+
+
+class SQLiteStorageTest(StorageTestMixin, unittest.TestCase):
+
+    def make_storage(self, path: str) -> Storage:
+        return SQLiteStorage(path, batch_size=2)
+
+
+@unittest.skipUnless(importlib.util.find_spec('duckdb'), 'duckdb is not installed')
+class DuckDBStorageTest(StorageTestMixin, unittest.TestCase):
+
+    def make_storage(self, path: str) -> Storage:
+        from src.db.duckdb_storage import DuckDBStorage
+        return DuckDBStorage(path, batch_size=2)
+
+
+if __name__ == '__main__':
+    unittest.main()